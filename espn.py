@@ -1,36 +1,345 @@
+import asyncio
+import functools
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Iterable, List, Tuple
-from models.game import Game
+from espn_cache import ResponseCache, ttl_for
+from models.game import Game, FINAL_STATUS_PREFIX
 from models.ranking import Ranking
 
 BASE = "https://site.api.espn.com/apis/site/v2/sports/football/college-football"
 
+DEFAULT_POOL_SIZE = 16  # keep-alive connections held per host; should cover settlement's worker count
+DEFAULT_TIMEOUTS = {    # (connect, read) seconds per endpoint
+    "scoreboard": (3.05, 15),
+    "summary": (3.05, 10),
+    "rankings": (3.05, 10),
+}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_RATE_LIMIT = 10.0   # requests per second across every caller of a client; None disables
+
+
+class RateLimiter:  # thread-safe token bucket; callers sleep until their token is due
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1   # reserve a token now; a negative balance is a queue of waiters
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class CircuitOpenError(RuntimeError):  # raised instead of calling ESPN while the breaker is open
+    pass
+
+
+class CircuitBreaker:   # stops calling ESPN after repeated failures; after a cooldown calls resume and the next failure re-opens it
+    def __init__(self, threshold: int = 5, cooldown: float = 60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None and time.monotonic() - self._opened_at < self.cooldown
+
+    def allow(self) -> bool:
+        return not self.is_open
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class Coalescer:    # lets concurrent callers for the same key share one in-flight call and its result
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, Future] = {}
+
+    def do(self, key: str, fn, timeout: float | None = None):   # followers wait at most timeout seconds for the leader
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+        if not leader:
+            return fut.result(timeout=timeout)  # followers get the leader's (shared, read-only) payload or exception
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class ESPNClient:   # pooled, keep-alive http client for the ESPN site api with jittered retries
+    def __init__(
+        self,
+        base: str = BASE,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        timeouts: dict[str, tuple[float, float]] | None = None,
+        cache: ResponseCache | None = None,
+        rate_limit: float | None = DEFAULT_RATE_LIMIT,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.base = base
+        self.cache = cache
+        self.limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.breaker = breaker or CircuitBreaker()
+        self._inflight = Coalescer()
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)  # retries handled below
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+
+    def _retry_after_backoff(self, attempt: int, resp: requests.Response | None, deadline_at: float | None) -> bool:    # sleep before the next attempt; False when out of attempts or time
+        if attempt >= self.retries:
+            return False
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = random.uniform(0, self.backoff * (2 ** attempt))
+        delay = min(delay, self.max_backoff)
+        if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+            return False    # another attempt could not finish before the caller's deadline
+        time.sleep(delay)
+        return True
+
+    def _timeout(self, endpoint: str, deadline_at: float | None) -> tuple[float, float]:   # (connect, read) for one attempt, clamped to what is left of the deadline
+        connect, read = self.timeouts.get(endpoint, (3.05, 20))
+        if deadline_at is None:
+            return connect, read
+        left = deadline_at - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"deadline passed before calling ESPN {endpoint}")
+        return min(connect, left), min(read, left)
+
+    def get_json(self, endpoint: str, params: dict | None = None, deadline_at: float | None = None) -> dict:  # duplicate concurrent requests share one call; deadline_at is a time.monotonic() cutoff
+        key = ResponseCache.make_key(endpoint, params)
+        wait = None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+        return self._inflight.do(key, lambda: self._get_json(key, endpoint, params, deadline_at), timeout=wait)
+
+    def _get_json(self, key: str, endpoint: str, params: dict | None, deadline_at: float | None = None) -> dict:   # cached payload if still fresh, else fetch from the network and cache it
+        if self.cache is None:
+            return self._fetch_json(endpoint, params, deadline_at)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        data = self._fetch_json(endpoint, params, deadline_at)
+        try:
+            self.cache.set(key, endpoint, data, ttl_for(endpoint, params, data))
+        except Exception:
+            pass    # a cache write failure should never fail the read
+        return data
+
+    def _fetch_json(self, endpoint: str, params: dict | None = None, deadline_at: float | None = None) -> dict:  # GET {base}/{endpoint} and decode JSON, retrying transient failures until deadline_at
+        url = f"{self.base}/{endpoint}"
+        # attempts and their socket timeouts both shrink to fit deadline_at, so an abandoned call stops on time
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"ESPN circuit open after {self.breaker.failures} consecutive failures")
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                r = self.session.get(url, params=params, timeout=self._timeout(endpoint, deadline_at))
+            except (requests.ConnectionError, requests.Timeout):
+                if not self._retry_after_backoff(attempt, None, deadline_at):
+                    self.breaker.record_failure()
+                    raise
+                continue
+            if r.status_code in RETRY_STATUSES:
+                if self._retry_after_backoff(attempt, r, deadline_at):
+                    continue
+                self.breaker.record_failure()
+            r.raise_for_status()
+            self.breaker.record_success()
+            return r.json()
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+    def get_scoreboard(self, week: int | None = None, seasontype: int = 2, dates: str | None = None, deadline_at: float | None = None) -> dict:
+        params = {"seasontype": seasontype}
+        if week is not None:
+            params["week"] = week
+        if dates is not None:
+            params["dates"] = dates
+        return self.get_json("scoreboard", params, deadline_at)
+
+    def get_summary(self, event_id: str, deadline_at: float | None = None) -> dict:
+        return self.get_json("summary", {"event": event_id}, deadline_at)
+
+    def get_rankings(self, deadline_at: float | None = None) -> dict:
+        return self.get_json("rankings", None, deadline_at)
+
+    def cache_stats(self) -> dict:  # hit/miss counters of the response cache, if any
+        return self.cache.stats() if self.cache is not None else {}
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: ESPNClient | None = None
+_client_lock = threading.Lock()
+
+def get_client() -> ESPNClient:  # shared client so every caller reuses the same warm connection pool
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ESPNClient(cache=ResponseCache())
+    return _client
+
+def configure(**kwargs) -> ESPNClient:  # replace the shared client, e.g. configure(pool_size=32, rate_limit=5); pass cache=None to disable caching
+    global _client
+    with _client_lock:
+        old = _client
+        if "cache" not in kwargs:
+            kwargs["cache"] = old.cache if old is not None else ResponseCache()
+        _client = ESPNClient(**kwargs)
+    if old is not None:
+        old.close()
+    return _client
+
 def get_scoreboard(week: int | None = None, seasontype: int = 2, dates: str | None = None) -> dict: # get scoreboard JSON from ESPN; seasontype=2 for regular season, 3 for postseason
-    params = {"seasontype": seasontype}
-    if week is not None:
-        params["week"] = week
-    if dates is not None:
-        params["dates"] = dates
-    r = requests.get(f"{BASE}/scoreboard", params=params, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    return get_client().get_scoreboard(week=week, seasontype=seasontype, dates=dates)
 
 def get_summary(event_id: str) -> dict:  # get game summary JSON from ESPN for a given event ID
-    r = requests.get(f"{BASE}/summary", params={"event": event_id}, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    return get_client().get_summary(event_id)
 
 def get_rankings() -> dict:
-    r = requests.get(f"{BASE}/rankings", timeout=20)
-    r.raise_for_status()
-    return r.json()
+    return get_client().get_rankings()
+
+
+DEFAULT_DEADLINE = 30.0     # seconds a single async request may take, retries included
+
+
+class AsyncESPNClient:  # asyncio api over the pooled client: bounded in-flight requests with per-request deadlines
+    def __init__(self, client: ESPNClient | None = None, max_concurrency: int = DEFAULT_POOL_SIZE, deadline: float = DEFAULT_DEADLINE):
+        self.client = client or get_client()
+        self.deadline = deadline
+        self._sem = asyncio.Semaphore(max_concurrency)
+        # blocking i/o runs on a private pool matched to the semaphore so it never starves the default executor
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="espn")
+
+    async def __aenter__(self) -> "AsyncESPNClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    async def _call(self, fn, *args, deadline: float | None = None, until: float | None = None, **kwargs):    # run one blocking client call under the semaphore, the deadline and an optional monotonic cutoff
+        async with self._sem:
+            timeout = deadline or self.deadline
+            if until is not None:
+                timeout = min(timeout, until - time.monotonic())
+            if timeout <= 0:
+                raise TimeoutError("no time left to call ESPN")
+            # the worker gets the same cutoff, so the request itself stops instead of outliving wait_for
+            deadline_at = time.monotonic() + timeout
+            loop = asyncio.get_running_loop()
+            fut = loop.run_in_executor(self._executor, functools.partial(fn, *args, deadline_at=deadline_at, **kwargs))
+            return await asyncio.wait_for(fut, timeout=timeout)
+
+    async def get_scoreboard(self, week: int | None = None, seasontype: int = 2, dates: str | None = None, deadline: float | None = None, until: float | None = None) -> dict:
+        return await self._call(self.client.get_scoreboard, week=week, seasontype=seasontype, dates=dates, deadline=deadline, until=until)
+
+    async def get_summary(self, event_id: str, deadline: float | None = None, until: float | None = None) -> dict:
+        return await self._call(self.client.get_summary, event_id, deadline=deadline, until=until)
+
+    async def get_rankings(self, deadline: float | None = None, until: float | None = None) -> dict:
+        return await self._call(self.client.get_rankings, deadline=deadline, until=until)
+
+    async def _gather(self, keys: list, call, budget: float | None) -> dict:  # run call(key, until) for every key; anything unfinished after `budget` seconds maps to a TimeoutError
+        until = None if budget is None else time.monotonic() + budget
+        tasks = {asyncio.ensure_future(call(k, until)): k for k in keys}
+        if not tasks:
+            return {}
+        _done, pending = await asyncio.wait(tasks, timeout=budget)
+        for t in pending:
+            t.cancel()
+        out = {}
+        for t, key in tasks.items():
+            if t in pending:
+                out[key] = TimeoutError(f"budget of {budget}s exhausted")
+            else:
+                out[key] = t.exception() or t.result()
+        return out
+
+    async def gather_summaries(self, event_ids: Iterable[str], deadline: float | None = None, budget: float | None = None) -> dict[str, dict | BaseException]:  # event_id -> summary, or the exception that request raised
+        ids = list(dict.fromkeys(str(e) for e in event_ids if e))
+        return await self._gather(ids, lambda e, until: self.get_summary(e, deadline=deadline, until=until), budget)
+
+    async def gather_scoreboards(self, slates: Iterable[tuple[int | None, int, str | None]], deadline: float | None = None, budget: float | None = None) -> dict[tuple, dict | BaseException]:  # (week, seasontype, dates) -> scoreboard, or the exception raised
+        keys = list(dict.fromkeys(slates))
+        return await self._gather(keys, lambda k, until: self.get_scoreboard(week=k[0], seasontype=k[1], dates=k[2], deadline=deadline, until=until), budget)
+
+    def close(self) -> None:    # the shared sync client stays open for other callers
+        self._executor.shutdown(wait=False)
+
+
+# sync entry points for batch jobs; must not be called from a running event loop
+
+def gather_summaries(event_ids: Iterable[str], max_concurrency: int = DEFAULT_POOL_SIZE, deadline: float = DEFAULT_DEADLINE, budget: float | None = None) -> dict[str, dict | BaseException]:
+    async def _run() -> dict[str, dict | BaseException]:
+        async with AsyncESPNClient(max_concurrency=max_concurrency, deadline=deadline) as client:
+            return await client.gather_summaries(event_ids, budget=budget)
+    return asyncio.run(_run())
+
+def gather_scoreboards(slates: Iterable[tuple[int | None, int, str | None]], max_concurrency: int = DEFAULT_POOL_SIZE, deadline: float = DEFAULT_DEADLINE, budget: float | None = None) -> dict[tuple, dict | BaseException]:
+    async def _run() -> dict[tuple, dict | BaseException]:
+        async with AsyncESPNClient(max_concurrency=max_concurrency, deadline=deadline) as client:
+            return await client.gather_scoreboards(slates, budget=budget)
+    return asyncio.run(_run())
 
 def parse_games(sb_json: dict) -> Iterable[Game]:   # parse games from ESPN scoreboard JSON
     season_year = (sb_json.get("season") or {}).get("year")
+    season_type = (sb_json.get("season") or {}).get("type")
     week = ((sb_json.get("week") or {}) or {}).get("number")
     events = (sb_json.get("events") or []) or []
     for ev in events:
         event_id = ev.get("id")
+        ev_season = ev.get("season") or {}     # per-event values win over the slate-level ones
         comp = (ev.get("competitions") or [{}])[0]
         status = ((comp.get("status") or {}).get("type") or {}).get("description", "scheduled")
         start = ev.get("date")
@@ -54,8 +363,9 @@ def parse_games(sb_json: dict) -> Iterable[Game]:   # parse games from ESPN scor
             continue
         yield Game(
             event_id=str(event_id),
-            week=week,
-            season_year=season_year,
+            week=(ev.get("week") or {}).get("number") or week,
+            season_year=ev_season.get("year") or season_year,
+            season_type=ev_season.get("type") or season_type,
             status=status,
             start=start,
             home_team=home[0],
@@ -98,8 +408,8 @@ def _is_upcoming_status(s: str) -> bool:    # determine if a game status string
     return ("sched" in s) or ("pre" in s) or ("upcoming" in s) or ("not started" in s)
 
 def _is_final_status(s: str) -> bool:   # determine if a game status string indicates a final/finished game
-    s = (s or "").lower()
-    return ("final" in s) or ("post" in s) or ("end" in s)
+    # a prefix match: "Postponed", "Canceled" and "End of 1st Quarter" are not results
+    return (s or "").lower().startswith(FINAL_STATUS_PREFIX.lower())
 
 def filter_upcoming_games(games: Iterable[Game]) -> List[Game]:  # filter games to only those that are upcoming (not started)
     return [g for g in games if _is_upcoming_status(g.status)]
@@ -0,0 +1,184 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+
+from models.base import DB_PATH
+from models.game import FINAL_STATUS_PREFIX
+
+# kept next to the main database (so CFB_DB_PATH moves it too); CFB_CACHE_PATH points it elsewhere
+CACHE_PATH = os.environ.get("CFB_CACHE_PATH") or os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "espn_cache.db")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024    # LRU eviction kicks in past this many bytes of payload
+
+FOREVER = None              # ttl for payloads that can never change (final games)
+UNSETTLED_TTL = 60 * 60     # seconds; postponed/canceled games are 'post' but can still be rescheduled and played
+PRE_GAME_TTL = 10 * 60      # seconds; kickoff times and lines move slowly before a game
+LIVE_TTL = 30               # seconds; scores change constantly while a game is in progress
+CURRENT_SLATE_TTL = 10 * 60 # seconds; "current week" scoreboards can roll over to a new week
+
+RANKINGS_RELEASE_WEEKDAY = 6    # polls are published on sundays...
+RANKINGS_RELEASE_HOUR_UTC = 19  # ...in the afternoon (eastern)
+SEASON_ROLLOVER_MONTH = 2       # bowls and the title game in january still belong to the previous season
+
+
+def rankings_week_start(now: datetime | None = None) -> datetime:   # most recent weekly poll release (utc)
+    now = now or datetime.now(timezone.utc)
+    release = now.replace(hour=RANKINGS_RELEASE_HOUR_UTC, minute=0, second=0, microsecond=0)
+    release -= timedelta(days=(now.weekday() - RANKINGS_RELEASE_WEEKDAY) % 7)
+    if release > now:
+        release -= timedelta(days=7)
+    return release
+
+def current_season_year(now: datetime | None = None) -> int:   # season ESPN serves when no year is pinned
+    now = now or datetime.now(timezone.utc)
+    return now.year if now.month >= SEASON_ROLLOVER_MONTH else now.year - 1
+
+def rankings_expiry(now: datetime | None = None) -> datetime:   # next weekly poll release (utc)
+    return rankings_week_start(now) + timedelta(days=7)
+
+
+def _state(comp: dict) -> str:  # espn competition state: 'pre', 'in' or 'post'
+    return ((((comp or {}).get("status") or {}).get("type") or {}).get("state") or "").lower()
+
+def _is_final(comp: dict) -> bool:    # 'post' alone also covers postponed and canceled games; only a completed game is immutable
+    status_type = ((comp or {}).get("status") or {}).get("type") or {}
+    if status_type.get("completed"):
+        return True
+    return (status_type.get("description") or "").lower().startswith(FINAL_STATUS_PREFIX.lower())
+
+def _kickoff(comp: dict) -> datetime | None:   # scheduled start of an espn competition/event ("2025-08-30T19:30Z"), aware utc
+    raw = (comp or {}).get("date")
+    if not raw:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(raw).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def _pre_game_ttl(kickoffs) -> float:  # PRE_GAME_TTL, but never past the earliest kickoff; 0 (don't cache) once one is due
+    # a cached 'pre' payload must not outlive kickoff, or cancel-lock checks would keep seeing an unstarted game
+    now = datetime.now(timezone.utc)
+    starts = [k for k in kickoffs if k is not None]
+    if not starts:
+        return PRE_GAME_TTL
+    return max(0.0, min(PRE_GAME_TTL, (min(starts) - now).total_seconds()))
+
+def ttl_for(endpoint: str, params: dict | None, payload: dict) -> float | None:    # seconds to keep a response; FOREVER for immutable ones
+    params = params or {}
+    if endpoint == "summary":
+        comps = (payload.get("header") or {}).get("competitions") or []
+        comp = comps[0] if comps else {}
+        state = _state(comp)
+        if state == "post":
+            return FOREVER if _is_final(comp) else UNSETTLED_TTL
+        return LIVE_TTL if state == "in" else _pre_game_ttl([_kickoff(comp)])
+
+    if endpoint == "scoreboard":
+        comps = [(ev.get("competitions") or [{}])[0] for ev in (payload.get("events") or [])]
+        states = {_state(comp) for comp in comps}
+        if "in" in states:
+            return LIVE_TTL
+        if comps and all(_is_final(comp) for comp in comps):
+            # a pinned, fully final week never changes; the "current" week can still roll over
+            return FOREVER if params.get("week") is not None else CURRENT_SLATE_TTL
+        ttl = _pre_game_ttl(_kickoff(comp) for comp in comps if _state(comp) != "post")
+        if any(_state(comp) == "post" and not _is_final(comp) for comp in comps):
+            # a postponed game keeps the week open, so a backfill refetch must see its new result
+            ttl = min(ttl, UNSETTLED_TTL)
+        return ttl
+
+    if endpoint == "rankings":
+        now = datetime.now(timezone.utc)
+        return max(60.0, (rankings_expiry(now) - now).total_seconds())
+
+    return PRE_GAME_TTL
+
+
+class ResponseCache:    # on-disk, size-bounded LRU cache of decoded ESPN JSON payloads
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " endpoint TEXT NOT NULL,"
+            " body TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL,"         # NULL = never expires
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)")
+
+    @staticmethod
+    def make_key(endpoint: str, params: dict | None = None) -> str:  # stable key: endpoint plus sorted query string
+        return f"{endpoint}?{urlencode(sorted((params or {}).items()))}"
+
+    def get(self, key: str) -> dict | None:     # cached payload or None on miss/expiry
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT body, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, endpoint: str, payload: dict, ttl: float | None) -> None:  # store payload; ttl None keeps it forever
+        if ttl is not None and ttl <= 0:
+            return
+        body = json.dumps(payload, separators=(",", ":"))
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, body, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, body, len(body), expires_at, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:   # drop expired rows, then least recently used rows until under max_bytes
+        self._conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self) -> dict:    # hit/miss counters for this process plus current on-disk footprint
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self.hits = self.misses = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -7,23 +7,27 @@ import espn
 
 from services.wallet_service import (
     ensure_schema as ensure_wallet_schema,
-    reset_wallet,
+    ensure_wallet,
     balance as wallet_balance,
+    ACTIVE_OWNER,
 )
 
 from services.bet_service import (
-    ensure_schema as ensure_bet_schema,
     create_slip,
-    list_pending_slips,
-    list_settled_slips,
-    list_all_slips,
+    list_slips_page,
 )
 
+from services.game_service import save_games
+from services.ranking_service import replace_rankings, latest_snapshot
+from espn_cache import rankings_week_start
+from services.backfill_service import backfill_season, final_games_for_week
+
 from services.settlement_service import (
-    ensure_schema as ensure_settle_schema,
     cancel_pending_slip,
-    check_and_settle,
+    cancel_all_cancellable,
+    settle,
 )
+from services.settlement_scheduler import get_scheduler
 
 from helpers.menu import (
     title,
@@ -39,26 +43,30 @@ try:
 except Exception:  # pragma: no cover
     print_summary = None  # type: ignore
 
+STARTUP_SETTLE_BUDGET = 5.0     # seconds startup may spend settling before the menu appears
+SETTLE_CALL_TIMEOUT = 3.0       # seconds per ESPN request inside that pass
+
 
 def init_db_and_wallet() -> None:
-    # make sure all tables exist
+    # make sure all tables exist (one versioned check covers every model)
     ensure_wallet_schema()
-    ensure_bet_schema()
-    ensure_settle_schema()
 
-    # reset demo wallet to a starting balance
-    reset_wallet(1000.0)
-    bal = wallet_balance()
+    # open the account's wallet with a starting balance the first time; never reset an existing one
+    ensure_wallet(1000.0, ACTIVE_OWNER)
+    bal = wallet_balance(ACTIVE_OWNER)
 
     # show confirmation to the user
     title("Initialized Database and Wallet")
-    kv("Wallet balance reset to", f"{bal:.2f} tokens")
+    kv(f"Wallet balance ({ACTIVE_OWNER})", f"{bal:.2f} tokens")
 
     # try to settle any slips if games finished
     try:
-        _checked, settled = check_and_settle()
-        if settled:
-            print(f"[settlement] Updated {settled} slip(s).\n")
+        report = settle(budget=STARTUP_SETTLE_BUDGET, call_timeout=SETTLE_CALL_TIMEOUT)
+        if report["settled"]:
+            print(f"[settlement] Updated {report['settled']} slip(s).\n")
+        if report["deferred"]:
+            note = " (ESPN unreachable)" if report["circuit_open"] else ""
+            print(f"[settlement] Deferred {len(report['deferred'])} game(s) to the next pass{note}.\n")
     except Exception as e:
         # settlement issues should not block startup
         print(f"[settlement] Skipped: {e}\n")
@@ -86,6 +94,11 @@ def _fetch_upcoming_games():
         print(f"\n[network] Could not load ESPN scoreboard: {e}\n")
         return []
     games = list(espn.parse_games(sb))
+    try:
+        # remember each game's week/seasontype so settlement can use the scoreboard
+        save_games(games)
+    except Exception:
+        pass
     return espn.filter_upcoming_games(games)
 
 def _prompt_numeric_choice(label: str, lo: int, hi: int) -> int:
@@ -168,15 +181,26 @@ def action_view_previous_by_week() -> None:
         print("Invalid week.\n")
         return
     week = int(raw)
-    sb = espn.get_scoreboard(week=week, seasontype=2)
-    games = list(espn.parse_games(sb))
-    finished = espn.filter_previous_games(games)
+    # finished weeks come from the local store; only unfinished weeks hit ESPN
+    try:
+        finished, source = final_games_for_week(week, season_type=2)
+    except Exception as e:
+        print(f"\n[network] Could not load ESPN scoreboard: {e}\n")
+        return
+    if source == "local-stale":
+        print("\n[offline] Showing stored results; this week may be incomplete.")
     print_games(finished, f"Previous / Final Games — Week {week}")
 
 def action_show_top25() -> None:
-    # pull and print top 25 rankings (ap first if present)
-    rjson = espn.get_rankings()
-    rankings = list(espn.parse_rankings(rjson))
+    # serve this week's stored snapshot; download and store a new one once the polls roll over
+    rankings = latest_snapshot(since=rankings_week_start().replace(tzinfo=None))
+    if not rankings:
+        rjson = espn.get_rankings()
+        rankings = list(espn.parse_rankings(rjson))
+        try:
+            replace_rankings(rankings)
+        except Exception:
+            pass
     ap = [r for r in rankings if (r.poll or "").lower().startswith("ap top 25")]
     rows = ap if ap else rankings
     section("Top 25 Rankings")
@@ -212,7 +236,7 @@ def action_show_top25() -> None:
 
 def action_create_slip() -> None:
     # start slip creation flow
-    bal = wallet_balance()
+    bal = wallet_balance(ACTIVE_OWNER)
     section("Create Slip")
     kv("Wallet (display only)", f"{bal:.2f} tokens")
     print("\nAllowed legs: 1, 3, 5, 7")
@@ -243,7 +267,7 @@ def action_create_slip() -> None:
         return
 
     # attempt to create the slip
-    slip, msg = create_slip(legs, stake)
+    slip, msg = create_slip(legs, stake, owner=ACTIVE_OWNER)
     if slip is None:
         print("Failed to create slip:", msg, "\n")
         return
@@ -252,80 +276,102 @@ def action_create_slip() -> None:
         f"\nCreated slip #{slip.id} with {slip.legs_count} legs, "
         f"stake {slip.stake_tokens:.2f}, status {slip.status.value}\n"
     )
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        scheduler.poke()    # plan checks for the new slip's games
+
+def _slip_line(s) -> str:
+    # one flat row per slip; progress comes from the stored counters, no legs are loaded
+    pays = s.payout() if s.status.value != "PENDING" else s.potential_payout()
+    label = "payout" if s.status.value != "PENDING" else "to win"
+    return (
+        f"Slip #{s.id}  legs={s.legs_count}  progress={s.wins}W-{s.losses}L-{s.pending_legs}P  "
+        f"stake={s.stake_tokens:.2f}  {label}={pays:.2f}  status={s.status.value}"
+    )
 
-def action_view_current_slips() -> None:
-    # settle any that finished, then show pending
-    try:
-        check_and_settle()
-    except Exception:
-        pass
+def _page_through_slips(status: str | None, newest_first: bool, line=None) -> int:
+    # print one keyset page at a time until the user stops or slips run out; returns how many were shown
+    line = line or _slip_line
+    cursor = None
+    shown = 0
+    while True:
+        slips, cursor = list_slips_page(status=status, cursor=cursor, newest_first=newest_first, owner=ACTIVE_OWNER)
+        for s in slips:
+            print(f"  {line(s)}\n")
+        shown += len(slips)
+        if cursor is None:
+            break
+        if prompt("Enter for the next page, q to stop: ").lower() == "q":
+            break
+        print()
+    if not shown:
+        print_empty()
+    return shown
 
-    slips = list_pending_slips()
+def action_view_current_slips() -> None:
+    # show pending (kept current by the background scheduler), oldest first
     section("Current Slips (PENDING)")
     print()
-    if not slips:
-        print_empty()
-        return
-    for s in slips:
-        print(f"  Slip #{s.id}  legs={s.legs_count}  stake={s.stake_tokens:.2f}  status={s.status.value}\n")
+    _page_through_slips("PENDING", newest_first=False)
 
 def action_view_settled_slips() -> None:
-    # settle any that finished, then show resolved
-    try:
-        check_and_settle()
-    except Exception:
-        pass
-
-    slips = list_settled_slips()
+    # show resolved (kept current by the background scheduler)
     section("Settled Slips (WON/LOST/SETTLED)")
     print()
-    if not slips:
-        print_empty()
-        return
-    for s in slips:
-        print(f"  Slip #{s.id}  legs={s.legs_count}  stake={s.stake_tokens:.2f}  status={s.status.value}\n")
+    _page_through_slips("SETTLED", newest_first=True)
 
 def action_view_all_slips() -> None:
-    # settle any that finished, then show everything
-    try:
-        check_and_settle()
-    except Exception:
-        pass
-
-    slips = list_all_slips()
+    # show everything (kept current by the background scheduler)
     section("All Slips (most recent first)")
     print()
-    if not slips:
-        print_empty()
-        return
-    for s in slips:
-        print(f"  Slip #{s.id}  legs={s.legs_count}  stake={s.stake_tokens:.2f}  status={s.status.value}\n")
+    _page_through_slips(None, newest_first=True)
 
 def action_cancel_pending_slip() -> None:
-    # settle any that finished, then allow cancel of pending
-    try:
-        check_and_settle()
-    except Exception:
-        pass
-
-    slips = list_pending_slips()
+    # allow cancel of pending
     section("Cancel Pending Slip")
     print("Current slips (PENDING):\n")
-    if not slips:
-        print_empty()
+    shown = _page_through_slips(
+        "PENDING", newest_first=False,
+        line=lambda s: f"Slip #{s.id}  legs={s.legs_count}  stake={s.stake_tokens:.2f}  status={s.status.value}",
+    )
+    if not shown:
         return
-    for s in slips:
-        print(f"  Slip #{s.id}  legs={s.legs_count}  stake={s.stake_tokens:.2f}  status={s.status.value}")
-    print()
 
     # prompt which slip to cancel
-    raw = prompt("Enter the slip # to cancel (or press Enter to abort): ")
+    raw = prompt("Enter the slip # to cancel, 'all' for every cancellable slip (or press Enter to abort): ")
     if not raw:
         print("Canceled.\n")
         return
+    if raw.lower() == "all":
+        canceled, locked = cancel_all_cancellable(owner=ACTIVE_OWNER)
+        kv("Canceled", ", ".join(f"#{sid}" for sid in canceled) or "none")
+        for sid, why in sorted(locked.items()):
+            print(f"  Slip #{sid} locked: {why}")
+        print()
+        return
     if not raw.isdigit():
         print("Invalid slip #.\n")
         return
 
-    ok, msg = cancel_pending_slip(int(raw))
+    ok, msg = cancel_pending_slip(int(raw), owner=ACTIVE_OWNER)
     print("\n" + msg + "\n")
+
+def action_backfill_season() -> None:
+    # load every week of a season into local storage (skips weeks already complete)
+    section("Backfill Season")
+    raw = prompt("Season year [2025]: ")
+    if raw and not raw.isdigit():
+        print("Invalid year.\n")
+        return
+    year = int(raw) if raw else 2025
+
+    report = backfill_season(year)
+    kv("Weeks fetched", f"{report['weeks_fetched']} of {report['weeks_total']} ({report['weeks_skipped']} already complete)")
+    kv("Games inserted", str(report["inserted"]))
+    kv("Games updated", str(report["updated"]))
+    kv("Weeks now final", str(report["weeks_completed"]))
+    if report["weeks_failed"]:
+        failed = ", ".join(f"{st}/{wk}" for st, wk in report["weeks_failed"])
+        kv("Failed (type/week)", failed)
+    kv("Elapsed", f"{report['seconds']:.2f}s")
+    print()
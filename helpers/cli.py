@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+from enum import Enum
+
+from models.base import sync_schema
+
+EXPORT_PAGE = 1000  # slips per keyset page while exporting
+
+
+def _json_default(o):
+    # datetimes as iso strings, enums as their value
+    if isinstance(o, datetime):
+        return o.isoformat()
+    if isinstance(o, Enum):
+        return o.value
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+def _emit(args, payload, lines) -> None:
+    # one JSON document with --json, otherwise the human-readable lines
+    if args.json:
+        json.dump(payload, sys.stdout, default=_json_default)
+        sys.stdout.write("\n")
+        return
+    for line in lines:
+        print(line)
+
+
+def _game_dict(g) -> dict:
+    return {
+        "event_id": g.event_id,
+        "season_year": g.season_year,
+        "season_type": g.season_type,
+        "week": g.week,
+        "status": g.status,
+        "start": g.start,
+        "away_team": g.away_team,
+        "home_team": g.home_team,
+        "away_score": g.away_score,
+        "home_score": g.home_score,
+    }
+
+
+def _slip_dict(s) -> dict:
+    return {
+        "id": s.id,
+        "owner": s.owner,
+        "created_at": s.created_at,
+        "status": s.status,
+        "legs_count": s.legs_count,
+        "stake": s.stake_tokens,
+        "wins": s.wins,
+        "losses": s.losses,
+        "pending_legs": s.pending_legs,
+        "payout": s.payout() if s.status.value != "PENDING" else None,
+        "potential_payout": s.potential_payout(),
+    }
+
+
+# subcommands
+
+def cmd_settle(args) -> int:
+    from services.settlement_service import settle
+    report = settle(
+        use_scoreboard=not args.no_scoreboard,
+        budget=args.budget,
+        call_timeout=args.call_timeout,
+    )
+    note = " (ESPN unreachable)" if report["circuit_open"] else ""
+    _emit(args, report, [
+        f"Checked {report['checked']} slip(s) across {report['events']} game(s); "
+        f"settled {report['settled']}, resolved {report['resolved']} game(s) in {report['seconds']:.2f}s",
+        f"Deferred {len(report['deferred'])} game(s) to the next pass{note}",
+    ])
+    return 0
+
+
+def cmd_games(args) -> int:
+    from services.game_service import list_week_games, latest_season_year, upsert_games
+    import espn
+
+    inserted = updated = 0
+    if args.local:
+        year = args.year or latest_season_year()
+        if args.week is None or year is None:
+            print("--local needs --week and a stored season (or --year)", file=sys.stderr)
+            return 2
+        games = list_week_games(year, args.week, args.season_type, final_only=args.final)
+        source = "local"
+    else:
+        sb = espn.get_scoreboard(week=args.week, seasontype=args.season_type, dates=str(args.year) if args.year else None)
+        games = list(espn.parse_games(sb))
+        inserted, updated = upsert_games(games)
+        source = "espn"
+
+    if args.final:
+        games = espn.filter_previous_games(games)
+    elif args.upcoming:
+        games = espn.filter_upcoming_games(games)
+
+    rows = [_game_dict(g) for g in games]
+    _emit(
+        args,
+        {"source": source, "week": args.week, "season_type": args.season_type, "inserted": inserted, "updated": updated, "games": rows},
+        [g.label() for g in games] + [f"{len(rows)} game(s) from {source}; {inserted} new, {updated} updated"],
+    )
+    return 0
+
+
+def cmd_rankings(args) -> int:
+    from services.ranking_service import latest_snapshot, replace_rankings
+    from espn_cache import rankings_week_start
+    import espn
+
+    rankings = [] if args.refresh else latest_snapshot(since=rankings_week_start().replace(tzinfo=None))
+    source = "local"
+    if not rankings:
+        rankings = list(espn.parse_rankings(espn.get_rankings()))
+        replace_rankings(rankings)
+        source = "espn"
+    if args.poll:
+        rankings = [r for r in rankings if (r.poll or "").lower().startswith(args.poll.lower())]
+    rankings = sorted(rankings, key=lambda r: (r.poll or "", r.rank))
+
+    rows = [
+        {
+            "poll": r.poll, "season_year": r.season_year, "week": r.week, "rank": r.rank,
+            "team_name": r.team_name, "team_abbr": r.team_abbr, "previous": r.previous,
+            "points": r.points, "first_place_votes": r.first_place_votes,
+        }
+        for r in rankings
+    ]
+    _emit(args, {"source": source, "rankings": rows}, [f"{r['poll']:<24} {r['rank']:>2}. {r['team_name']}" for r in rows])
+    return 0
+
+
+def cmd_slips(args) -> int:
+    from services.bet_service import list_slips_page
+
+    owner = None if args.all_owners else args.owner
+    slips, cursor = [], None
+    while len(slips) < args.limit:
+        page, cursor = list_slips_page(
+            status=args.status, cursor=cursor, page_size=min(EXPORT_PAGE, args.limit - len(slips)),
+            newest_first=not args.oldest_first, owner=owner,
+        )
+        slips.extend(page)
+        if cursor is None:
+            break
+
+    rows = [_slip_dict(s) for s in slips]
+    _emit(args, {"owner": owner, "status": args.status, "slips": rows}, [
+        f"Slip #{r['id']}  owner={r['owner']}  legs={r['legs_count']}  "
+        f"progress={r['wins']}W-{r['losses']}L-{r['pending_legs']}P  stake={r['stake']:.2f}  status={r['status'].value}"
+        for r in rows
+    ] + [f"{len(rows)} slip(s)"])
+    return 0
+
+
+def cmd_backfill(args) -> int:
+    from services.backfill_service import backfill_season
+    report = backfill_season(args.year, max_workers=args.workers, force=args.force)
+    _emit(args, report, [
+        f"Season {report['season_year']}: fetched {report['weeks_fetched']} of {report['weeks_total']} week(s) "
+        f"({report['weeks_skipped']} already complete), {report['weeks_completed']} now final",
+        f"Games inserted {report['inserted']}, updated {report['updated']} in {report['seconds']:.2f}s",
+    ] + [f"Failed week {st}/{wk}" for st, wk in report["weeks_failed"]])
+    return 1 if report["weeks_failed"] else 0
+
+
+def _export_slips(owner: str | None, status: str | None):
+    # slip rows with their legs, in the same shape helpers.import_slips reads back
+    from sqlalchemy import select
+    from models.base import ReadSessionLocal
+    from models.bet import BetLeg
+    from services.bet_service import list_slips_page
+
+    cursor = None
+    while True:
+        page, cursor = list_slips_page(status=status, cursor=cursor, page_size=EXPORT_PAGE, newest_first=False, owner=owner)
+        legs: dict[int, list] = {}
+        if page:
+            with ReadSessionLocal() as db:
+                rows = db.execute(
+                    select(BetLeg.slip_id, BetLeg.event_id, BetLeg.pick_team_name, BetLeg.result)
+                    .where(BetLeg.slip_id.in_([s.id for s in page]))
+                    .order_by(BetLeg.slip_id, BetLeg.id)
+                )
+                for slip_id, event_id, pick, result in rows:
+                    legs.setdefault(slip_id, []).append({"event_id": event_id, "pick": pick, "result": result})
+        for s in page:
+            row = _slip_dict(s)
+            row["legs"] = legs.get(s.id, [])
+            yield row
+        if cursor is None:
+            return
+
+
+def _export_games(year: int | None):
+    from sqlalchemy import select
+    from models.base import ReadSessionLocal
+    from models.game import Game
+
+    stmt = select(Game).order_by(Game.season_year, Game.season_type, Game.week, Game.id)
+    if year is not None:
+        stmt = stmt.where(Game.season_year == year)
+    with ReadSessionLocal() as db:
+        for g in db.scalars(stmt).yield_per(EXPORT_PAGE):
+            yield _game_dict(g)
+
+
+def _export_ledger(owner: str | None):
+    from sqlalchemy import select
+    from models.base import ReadSessionLocal
+    from models.wallet import WalletTx
+
+    stmt = select(WalletTx).order_by(WalletTx.id)
+    if owner is not None:
+        stmt = stmt.where(WalletTx.owner == owner)
+    with ReadSessionLocal() as db:
+        for t in db.scalars(stmt).yield_per(EXPORT_PAGE):
+            yield {"id": t.id, "created_at": t.created_at, "owner": t.owner, "amount": t.amount, "reason": t.reason}
+
+
+def cmd_export(args) -> int:
+    owner = None if args.all_owners else args.owner
+    if args.table == "slips":
+        rows = _export_slips(owner, args.status)
+    elif args.table == "games":
+        rows = _export_games(args.year)
+    else:
+        rows = _export_ledger(owner)
+
+    out = open(args.out, "w", newline="", encoding="utf-8") if args.out else sys.stdout
+    count = 0
+    try:
+        if args.format == "csv":
+            writer = None
+            for row in rows:
+                if "legs" in row:   # same "event_id:team;..." form the importer reads
+                    row["legs"] = ";".join(f"{leg['event_id']}:{leg['pick']}" for leg in row["legs"])
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow({k: _json_default(v) if isinstance(v, (datetime, Enum)) else v for k, v in row.items()})
+                count += 1
+        else:
+            for row in rows:
+                out.write(json.dumps(row, default=_json_default) + "\n")
+                count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.out:    # stdout carries the data itself; only report when writing to a file
+        _emit(args, {"table": args.table, "rows": count, "out": args.out}, [f"Exported {count} {args.table} row(s) to {args.out}"])
+    return 0
+
+
+def cmd_import(args) -> int:
+    from helpers.import_slips import import_slips, print_report
+    report = import_slips(args.path, owner=args.owner, batch_size=max(1, args.batch_size))
+    if args.json:
+        _emit(args, report, [])
+    else:
+        print_report(report)
+    return 0 if not report["rejected"] else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from helpers.import_slips import BATCH_SIZE
+    from services.backfill_service import MAX_WORKERS
+    from services.settlement_service import CALL_TIMEOUT
+    from services.wallet_service import ACTIVE_OWNER
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="machine-readable JSON output")
+
+    parser = argparse.ArgumentParser(prog="main.py", description="College football data and bet slips. Run without a command for the interactive menu.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("settle", parents=[common], help="run one settlement pass")
+    p.add_argument("--budget", type=float, default=None, help="seconds the pass may take (default: no limit)")
+    p.add_argument("--call-timeout", type=float, default=CALL_TIMEOUT, help="seconds per ESPN request")
+    p.add_argument("--no-scoreboard", action="store_true", help="resolve games through per-event summaries only")
+    p.set_defaults(func=cmd_settle)
+
+    p = sub.add_parser("games", parents=[common], help="refresh and list one scoreboard week")
+    p.add_argument("--week", type=int, default=None, help="ESPN week number (default: current week)")
+    p.add_argument("--season-type", type=int, default=2, help="2=regular season, 3=postseason")
+    p.add_argument("--year", type=int, default=None, help="season year")
+    p.add_argument("--local", action="store_true", help="read stored games only; no network")
+    which = p.add_mutually_exclusive_group()
+    which.add_argument("--final", action="store_true", help="only finished games")
+    which.add_argument("--upcoming", action="store_true", help="only games not started")
+    p.set_defaults(func=cmd_games)
+
+    p = sub.add_parser("rankings", parents=[common], help="this week's polls (stored snapshot unless stale)")
+    p.add_argument("--refresh", action="store_true", help="download a new snapshot even if this week's is stored")
+    p.add_argument("--poll", default=None, help="poll name prefix, e.g. 'AP Top 25'")
+    p.set_defaults(func=cmd_rankings)
+
+    p = sub.add_parser("slips", parents=[common], help="list slips")
+    p.add_argument("--status", choices=["PENDING", "SETTLED"], type=str.upper, default=None)
+    p.add_argument("--owner", default=ACTIVE_OWNER, help="account (default: CFB_OWNER or 'default')")
+    p.add_argument("--all-owners", action="store_true", help="every account's slips")
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--oldest-first", action="store_true")
+    p.set_defaults(func=cmd_slips)
+
+    p = sub.add_parser("backfill", parents=[common], help="load a full season into local storage")
+    p.add_argument("--year", type=int, default=2025)
+    p.add_argument("--workers", type=int, default=MAX_WORKERS)
+    p.add_argument("--force", action="store_true", help="refetch weeks already marked complete")
+    p.set_defaults(func=cmd_backfill)
+
+    p = sub.add_parser("export", parents=[common], help="dump slips, games or the wallet ledger")
+    p.add_argument("table", nargs="?", choices=["slips", "games", "ledger"], default="slips")
+    p.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    p.add_argument("--out", default=None, help="file to write (default: stdout)")
+    p.add_argument("--status", choices=["PENDING", "SETTLED"], type=str.upper, default=None, help="slips only")
+    p.add_argument("--owner", default=ACTIVE_OWNER, help="slips/ledger account")
+    p.add_argument("--all-owners", action="store_true")
+    p.add_argument("--year", type=int, default=None, help="games only")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", parents=[common], help="bulk-load slips from a CSV or JSONL file")
+    p.add_argument("path")
+    p.add_argument("--owner", default=None, help="account for rows that don't name one")
+    p.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    p.set_defaults(func=cmd_import)
+
+    return parser
+
+
+def run(argv: list[str]) -> int:
+    # headless entry point: schema check only; never touches wallet balances or starts the scheduler
+    args = build_parser().parse_args(argv)
+    sync_schema()
+    return args.func(args)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Iterator
+
+from models.base import sync_schema
+from services.bet_service import create_slips, leg_pair
+
+BATCH_SIZE = 5000   # slips per create_slips transaction
+LEG_SEP = ";"       # csv legs column: "401628374:Ohio State;401628375:Michigan"
+PICK_SEP = ":"
+
+
+def _parse_time(raw) -> datetime | None:
+    # iso-8601 timestamps (a trailing Z is accepted); stored naive utc like the rest of the db
+    if not raw:
+        return None
+    ts = datetime.fromisoformat(str(raw).strip().replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _parse_legs(raw) -> list[tuple[str, str]]:
+    # accepts the csv string form, [[event_id, pick], ...] or [{"event_id": ..., "pick": ...}, ...]
+    if isinstance(raw, str):
+        legs = []
+        for part in raw.split(LEG_SEP):
+            if not part.strip():
+                continue
+            if PICK_SEP not in part:
+                raise ValueError(f"leg '{part.strip()}' is not event_id{PICK_SEP}team")
+            eid, team = part.split(PICK_SEP, 1)
+            legs.append((eid, team))
+        return legs
+    legs = []
+    for leg in raw or []:
+        if isinstance(leg, dict):
+            legs.append((leg.get("event_id"), leg.get("pick") or leg.get("pick_team_name")))
+        else:
+            legs.append(leg_pair(leg))
+    return legs
+
+
+def read_rows(path: str) -> Iterator[tuple[int, dict | None, str]]:
+    # yields (line number, row for create_slips or None, reject reason) for a .csv or .jsonl file
+    is_csv = os.path.splitext(path)[1].lower() == ".csv"
+    with open(path, newline="", encoding="utf-8") as f:
+        if is_csv:
+            reader = csv.DictReader(f)
+            records = ((reader.line_num, rec) for rec in reader)
+        else:
+            records = ((n, line) for n, line in enumerate(f, start=1) if line.strip())
+        for line_no, rec in records:
+            try:
+                if not is_csv:
+                    rec = json.loads(rec)
+                    if not isinstance(rec, dict):
+                        raise ValueError("expected a JSON object")
+                row = {
+                    "owner": (rec.get("owner") or "").strip() or None,
+                    "stake": rec.get("stake"),
+                    "legs": _parse_legs(rec.get("legs")),
+                    "created_at": _parse_time(rec.get("created_at")),
+                }
+            except Exception as e:
+                yield line_no, None, f"unreadable row: {e}"
+                continue
+            yield line_no, row, ""
+
+
+def import_slips(path: str, owner: str | None = None, batch_size: int = BATCH_SIZE) -> dict:
+    # load every slip in the file; returns counts, throughput and per-line rejects
+    sync_schema()
+    started = time.perf_counter()
+    created = 0
+    rejects: list[tuple[int, str]] = []
+    batch: list[dict] = []
+    lines: list[int] = []
+
+    def _flush() -> None:
+        nonlocal created
+        try:
+            ids, bad = create_slips(batch)
+            created += len(ids)
+            rejects.extend((lines[i], why) for i, why in bad)
+        except Exception:
+            # the batch transaction rolled back; retry row by row so one bad row costs only itself
+            for row, line_no in zip(batch, lines):
+                try:
+                    ids, bad = create_slips([row])
+                except Exception as e:
+                    rejects.append((line_no, f"insert failed: {e.__class__.__name__}: {str(e).splitlines()[0]}"))
+                    continue
+                created += len(ids)
+                rejects.extend((line_no, why) for _i, why in bad)
+        batch.clear()
+        lines.clear()
+
+    for line_no, row, why in read_rows(path):
+        if row is None:
+            rejects.append((line_no, why))
+            continue
+        row["owner"] = row["owner"] or owner
+        batch.append(row)
+        lines.append(line_no)
+        if len(batch) >= batch_size:
+            _flush()
+    if batch:
+        _flush()
+
+    seconds = time.perf_counter() - started
+    return {
+        "file": path,
+        "created": created,
+        "rejected": len(rejects),
+        "seconds": round(seconds, 3),
+        "slips_per_second": round(created / seconds, 1) if seconds > 0 else 0.0,
+        "rejects": [{"line": n, "reason": why} for n, why in sorted(rejects)],
+    }
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"Imported {report['created']} slip(s) from {report['file']} in {report['seconds']:.3f}s "
+        f"({report['slips_per_second']:.1f} slips/s); {report['rejected']} rejected"
+    )
+    for r in report["rejects"]:
+        print(f"  line {r['line']}: {r['reason']}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m helpers.import_slips", description="Bulk-load bet slips from a CSV or JSONL file.")
+    parser.add_argument("path", help=".csv (owner,stake,legs,created_at) or .jsonl file")
+    parser.add_argument("--owner", help="account for rows that don't name one (default: the default wallet)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="slips per transaction")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = import_slips(args.path, owner=args.owner, batch_size=max(1, args.batch_size))
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+    return 0 if not report["rejected"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -99,5 +99,6 @@ def print_menu(wallet_balance_fn) -> None:
     print("6) View settled slips (pending/settled)")
     print("7) View all slips")
     print("8) Cancel a pending slip (if no legs underway)")
+    print("9) Backfill a full season into local storage")
     print("0) Exit")
     print(line("="))
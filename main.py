@@ -1,27 +1,50 @@
 from __future__ import annotations
 
+import os
 import sys
+import threading
 
-from services.wallet_service import balance as wallet_balance
+from models.base import sync_schema
+from services.wallet_service import balance as wallet_balance, ensure_wallet, ACTIVE_OWNER
 from helpers.menu import print_menu
-from helpers.actions import (
-    init_db_and_wallet,
-    action_list_upcoming_games,
-    action_view_previous_by_week,
-    action_show_top25,
-    action_create_slip,
-    action_view_current_slips,
-    action_view_settled_slips,
-    action_view_all_slips,
-    action_cancel_pending_slip,
-)
+
+FAST_START = os.environ.get("CFB_FAST_START", "1") != "0"  # CFB_FAST_START=0 restores the blocking settlement at launch
+STARTING_BALANCE = 1000.0
+
+
+def _warm_start() -> None:
+    # load the network/actions stack and start background settlement while the menu is on screen
+    import helpers.actions  # noqa: F401
+    from services.settlement_scheduler import start_scheduler
+    start_scheduler()
+
+
+def fast_init() -> None:
+    # versioned schema check and wallet seed only; no network before the first menu
+    sync_schema()
+    ensure_wallet(STARTING_BALANCE, ACTIVE_OWNER)
+    threading.Thread(target=_warm_start, name="warm-start", daemon=True).start()
+
+
+def full_init() -> None:
+    from helpers.actions import init_db_and_wallet
+    from services.settlement_scheduler import start_scheduler
+    init_db_and_wallet()
+    start_scheduler()   # settle in the background so slip views only read the database
+
 
 # main loop
 def main(): 
-    init_db_and_wallet()
+    if len(sys.argv) > 1:   # subcommand given: run it headless and exit (see helpers/cli.py)
+        from helpers.cli import run
+        sys.exit(run(sys.argv[1:]))
+    if FAST_START:
+        fast_init()
+    else:
+        full_init()
     while True:
         try:
-            print_menu(wallet_balance)
+            print_menu(lambda: wallet_balance(ACTIVE_OWNER))
             choice = input("Select: ").strip()
         except (EOFError, KeyboardInterrupt):
             print("\nGoodbye!")
@@ -30,22 +53,27 @@ def main():
         if choice == "0":
             print("Goodbye!")
             sys.exit(0)
-        elif choice == "1":
-            action_list_upcoming_games()
+
+        from helpers import actions  # imported lazily; usually already warmed in the background
+
+        if choice == "1":
+            actions.action_list_upcoming_games()
         elif choice == "2":
-            action_view_previous_by_week()
+            actions.action_view_previous_by_week()
         elif choice == "3":
-            action_show_top25()
+            actions.action_show_top25()
         elif choice == "4":
-            action_create_slip()
+            actions.action_create_slip()
         elif choice == "5":
-            action_view_current_slips()
+            actions.action_view_current_slips()
         elif choice == "6":
-            action_view_settled_slips()
+            actions.action_view_settled_slips()
         elif choice == "7":
-            action_view_all_slips()
+            actions.action_view_all_slips()
         elif choice == "8":
-            action_cancel_pending_slip()
+            actions.action_cancel_pending_slip()
+        elif choice == "9":
+            actions.action_backfill_season()
         else:
             print("Invalid choice.\n")
 
@@ -0,0 +1,28 @@
+from __future__ import annotations
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, DateTime, UniqueConstraint
+from datetime import datetime
+from .base import Base, data_migration
+from .game import FINAL_STATUS_PREFIX
+
+class BackfillWeek(Base):   # scoreboard week whose games are fully stored and final; skipped on later backfills
+    __tablename__ = "backfill_weeks"
+    __table_args__ = (UniqueConstraint("season_year", "season_type", "week", name="uq_backfill_week"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    season_year: Mapped[int] = mapped_column(Integer)
+    season_type: Mapped[int] = mapped_column(Integer)    # 2=regular, 3=postseason
+    week: Mapped[int] = mapped_column(Integer)
+    games: Mapped[int] = mapped_column(Integer, default=0)
+    completed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+@data_migration(7)
+def _reopen_unfinished_weeks(conn) -> None:  # weeks marked complete while a game was postponed or canceled get refetched
+    conn.exec_driver_sql(
+        "DELETE FROM backfill_weeks WHERE EXISTS ("
+        " SELECT 1 FROM games g WHERE g.season_year = backfill_weeks.season_year"
+        " AND g.season_type = backfill_weeks.season_type AND g.week = backfill_weeks.week"
+        " AND (g.status IS NULL OR g.status NOT LIKE ?))",
+        (FINAL_STATUS_PREFIX + "%",),
+    )
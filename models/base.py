@@ -1,13 +1,104 @@
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
 import os
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "storage", "storage.db") # ensure file is in storage dir
-os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)    # make dir if needed
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "storage", "storage.db") # ensure file is in storage dir
+DB_PATH = os.environ.get("CFB_DB_PATH") or DEFAULT_DB_PATH  # CFB_DB_PATH points the app at another database file
+os.makedirs(os.path.dirname(os.path.abspath(DB_PATH)), exist_ok=True)    # make dir if needed
 
-engine = create_engine(f"sqlite:///{DB_PATH}", echo=False)  # initialize db engine
+# pragmas applied to every new connection; pick one with CFB_SQLITE_PROFILE
+SQLITE_PROFILES = {
+    "default": {    # concurrent ui readers + background settlement writer
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,           # ms to wait on a locked db instead of failing
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -32000,           # negative = KiB, so ~32 MB of page cache
+        "temp_store": "MEMORY",
+    },
+    "safe": {       # rollback journal with full fsync, e.g. for network filesystems where WAL is unsafe
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+}
+SQLITE_PROFILE = os.environ.get("CFB_SQLITE_PROFILE", "default")
+READ_ONLY_SKIP = {"journal_mode"}   # a read-only connection can't change the journal mode (WAL persists in the file anyway)
+
+
+def make_engine(path: str = DB_PATH, profile: str | dict = SQLITE_PROFILE, read_only: bool = False) -> Engine:  # sqlite engine with the profile's pragmas applied on connect
+    pragmas = dict(SQLITE_PROFILES[profile] if isinstance(profile, str) else profile)
+    if read_only:
+        pragmas = {k: v for k, v in pragmas.items() if k not in READ_ONLY_SKIP}
+        pragmas["query_only"] = "ON"
+        url = f"sqlite:///file:{os.path.abspath(path)}?mode=ro&uri=true"
+    else:
+        url = f"sqlite:///{path}"
+    eng = create_engine(url, echo=False)
+
+    @event.listens_for(eng, "connect")
+    def _apply_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for key, value in pragmas.items():
+            cur.execute(f"PRAGMA {key}={value}")
+        cur.close()
+
+    return eng
+
+
+engine = make_engine()  # initialize db engine
+read_engine = make_engine(read_only=True)   # reporting queries; can never take the write lock
 
 class Base(DeclarativeBase):    # base class for models
     pass
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False) # session factory
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)    # read-only session factory
+
+SCHEMA_VERSION = 8     # bump whenever a model gains a table, column or index
+_schema_ready = False   # set once this process has verified the schema
+_data_migrations: dict[int, list] = {}  # version -> fn(conn) steps that backfill data for that version
+
+def data_migration(version: int):   # register fn(conn) to run once when a db is upgraded past `version`
+    def register(fn):
+        _data_migrations.setdefault(version, []).append(fn)
+        return fn
+    return register
+
+def sync_schema(force: bool = False) -> None:  # bring the db up to SCHEMA_VERSION; a cheap PRAGMA check when already current
+    global _schema_ready
+    if _schema_ready and not force:
+        return
+    with engine.connect() as conn:
+        current = conn.exec_driver_sql("PRAGMA user_version").scalar() or 0
+    if current >= SCHEMA_VERSION and not force:
+        _schema_ready = True
+        return
+
+    from models import backfill, bet, game, ranking, wallet  # noqa: F401  every table must be registered before migrating
+
+    # create missing tables, then add columns/indexes that create_all won't add to existing sqlite tables
+    Base.metadata.create_all(engine)
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(dialect=engine.dialect)}"
+                if col.server_default is not None:  # let sqlite backfill existing rows
+                    default = col.server_default.arg
+                    ddl += f" DEFAULT {getattr(default, 'text', default)}"
+                conn.execute(text(ddl))
+    for table in Base.metadata.sorted_tables:
+        for idx in table.indexes:
+            idx.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        for version in sorted(v for v in _data_migrations if current < v <= SCHEMA_VERSION):
+            for step in _data_migrations[version]:
+                step(conn)
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    _schema_ready = True
@@ -1,11 +1,14 @@
 from __future__ import annotations
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, ForeignKey, Enum, DateTime, Float
+from sqlalchemy import Integer, String, ForeignKey, Enum, DateTime, Float, Index, select, update, func, text
 from datetime import datetime
 from enum import Enum as PyEnum
-from .base import Base
+from typing import Iterable
+from .base import Base, data_migration
+from .wallet import DEFAULT_OWNER
 
 ALLOWED_LEGS = {1, 3, 5, 7}
+PAYOUT_MULTIPLIERS = {1: 1.9, 3: 5.0, 5: 12.0, 7: 25.0}    # simple fixed odds based on legs count
 
 class SlipStatus(PyEnum):   # internal status
     PENDING = "PENDING"
@@ -18,16 +21,29 @@ class LegResult(PyEnum):    # from user perspective
     WIN = "WIN"
     LOSS = "LOSS"
     PUSH = "PUSH"  
+    MOOT = "MOOT"   # left unresolved because the slip was already decided by its other legs
 
 class BetSlip(Base):    # bet slip with multiple legs
     __tablename__ = "bet_slips"
+    __table_args__ = (
+        Index("ix_bet_slips_status_created", "status", "created_at", "id"),  # keyset pages per status
+        Index("ix_bet_slips_created", "created_at", "id"),                   # keyset pages across all slips
+        Index("ix_bet_slips_owner_status_created", "owner", "status", "created_at", "id"),   # one account's slips per status
+        Index("ix_bet_slips_owner_created", "owner", "created_at", "id"),                    # one account's slips across statuses
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    owner: Mapped[str] = mapped_column(String(64), default=DEFAULT_OWNER, server_default=text(f"'{DEFAULT_OWNER}'"))   # wallet the slip belongs to
     legs_count: Mapped[int] = mapped_column(Integer)
     stake_tokens: Mapped[float] = mapped_column(Float, default=0.0)
     status: Mapped[SlipStatus] = mapped_column(Enum(SlipStatus), default=SlipStatus.PENDING)
 
+    # progress counters, maintained in the same transaction that settles a leg (see recount_progress)
+    wins: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    losses: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    pending_legs: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
     legs: Mapped[list[BetLeg]] = relationship("BetLeg", back_populates="slip", cascade="all, delete-orphan")
 
     def required_wins(self) -> int:
@@ -39,15 +55,50 @@ class BetSlip(Base):    # bet slip with multiple legs
         losses = sum(1 for l in self.legs if l.result == LegResult.LOSS)
         return wins, losses
 
+    def potential_payout(self) -> float:
+        return round(self.stake_tokens * PAYOUT_MULTIPLIERS.get(self.legs_count, 1.0), 2)
+
+    def payout(self) -> float:  # what the slip pays going by its counters; 0 until it has enough wins
+        return self.potential_payout() if (self.wins or 0) >= self.required_wins() else 0.0
+
 class BetLeg(Base):   # individual bet leg within a slip
     __tablename__ = "bet_legs"
+    __table_args__ = (Index("ix_bet_legs_event_result", "event_id", "result"),)    # event -> pending legs lookups during settlement
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     slip_id: Mapped[int] = mapped_column(ForeignKey("bet_slips.id", ondelete="CASCADE"))
-    event_id: Mapped[str] = mapped_column(String(32), index=True)
+    event_id: Mapped[str] = mapped_column(String(32))   # indexed as the prefix of ix_bet_legs_event_result
 
     # store a human-stable reference for winner selection
     pick_team_name: Mapped[str] = mapped_column(String(100))  # user’s chosen winner
     result: Mapped[LegResult] = mapped_column(Enum(LegResult), default=LegResult.PENDING)
 
     slip: Mapped[BetSlip] = relationship("BetSlip", back_populates="legs")
+
+
+def recount_progress(slip_ids: Iterable[int] | None = None):    # UPDATE recomputing wins/losses/pending_legs from bet_legs (all slips when slip_ids is None)
+    slips, legs = BetSlip.__table__, BetLeg.__table__
+
+    def _count(result: LegResult):
+        return (
+            select(func.count())
+            .where(legs.c.slip_id == slips.c.id, legs.c.result == result)
+            .scalar_subquery()
+        )
+
+    stmt = update(slips).values(
+        wins=_count(LegResult.WIN),
+        losses=_count(LegResult.LOSS),
+        pending_legs=_count(LegResult.PENDING),
+    )
+    if slip_ids is not None:
+        stmt = stmt.where(slips.c.id.in_(set(slip_ids)))
+    return stmt
+
+@data_migration(3)
+def _backfill_progress_counters(conn) -> None:
+    conn.execute(recount_progress())
+
+@data_migration(8)
+def _drop_event_id_index(conn) -> None:  # ix_bet_legs_event_result already leads with event_id
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_bet_legs_event_id")
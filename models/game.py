@@ -1,14 +1,18 @@
-from sqlalchemy import String, Integer, DateTime
+from sqlalchemy import String, Integer, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column
-from .base import Base
+from .base import Base, data_migration
+
+FINAL_STATUS_PREFIX = "Final"   # ESPN status descriptions for finished games: "Final", "Final/OT", "Final/2OT", ...
 
 class Game(Base):   # college football game table
     __tablename__ = "games"
+    __table_args__ = (Index("ix_games_season_type_week_status", "season_year", "season_type", "week", "status"),)   # week history lookups, finals filtered in the index
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     event_id: Mapped[str] = mapped_column(String(32), unique=True, index=True)
     week: Mapped[int | None] = mapped_column(Integer, nullable=True)
     season_year: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    season_type: Mapped[int | None] = mapped_column(Integer, nullable=True)  # 2=regular, 3=postseason
     status: Mapped[str | None] = mapped_column(String(32))
     start: Mapped[str | None] = mapped_column(String(40))  # ISO string
 
@@ -20,3 +24,8 @@ class Game(Base):   # college football game table
     def label(self) -> str:
         score = f"{self.away_score or 0}-{self.home_score or 0}" if (self.away_score is not None and self.home_score is not None) else "vs"
         return f"[{self.status or 'scheduled'}] {self.away_team} @ {self.home_team} ({score})  {self.start}"
+
+
+@data_migration(7)
+def _drop_season_week_status_index(conn) -> None:  # replaced by ix_games_season_type_week_status
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_games_season_week_status")
@@ -1,9 +1,11 @@
-from sqlalchemy import String, Integer
+from sqlalchemy import String, Integer, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
 from .base import Base
 
 class Ranking(Base):    # college football ranking entry
     __tablename__ = "rankings"
+    __table_args__ = (Index("ix_rankings_poll_season_week", "poll", "season_year", "week", "rank"),)   # snapshot lookups
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     poll: Mapped[str] = mapped_column(String(40))         
@@ -16,3 +18,4 @@ class Ranking(Base):    # college football ranking entry
     previous: Mapped[int | None] = mapped_column(Integer, nullable=True)
     points: Mapped[int | None] = mapped_column(Integer, nullable=True)
     first_place_votes: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    fetched_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)  # when this snapshot was downloaded
@@ -1,9 +1,11 @@
 from __future__ import annotations
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Integer, String, Float, DateTime
+from sqlalchemy import Integer, String, Float, DateTime, Index
 from datetime import datetime
 from .base import Base
 
+DEFAULT_OWNER = "default"   # the single-user cli's account
+
 class Wallet(Base):     # user wallet with balance
     __tablename__ = "wallets"
 
@@ -13,9 +15,28 @@ class Wallet(Base):     # user wallet with balance
 
 class WalletTx(Base):   # wallet transaction log
     __tablename__ = "wallet_txs"
+    __table_args__ = (
+        Index("ix_wallet_txs_owner_created", "owner", "created_at"),    # per-owner history, newest first
+        Index("ix_wallet_txs_owner_id", "owner", "id"),                 # ledger tails after a checkpoint's last_tx_id
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     owner: Mapped[str] = mapped_column(String(64), index=True)
     amount: Mapped[float] = mapped_column(Float)  # + credit / - debit
     reason: Mapped[str] = mapped_column(String(200), default="")
+
+class WalletCheckpoint(Base):   # ledger balance as of a given transaction; balance_at and reconcile only sum the tail after it
+    __tablename__ = "wallet_checkpoints"
+    __table_args__ = (
+        Index("ix_wallet_checkpoints_owner_tx", "owner", "last_tx_id", unique=True),    # latest checkpoint per owner
+        Index("ix_wallet_checkpoints_owner_as_of", "owner", "as_of"),                   # nearest checkpoint before a timestamp
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    owner: Mapped[str] = mapped_column(String(64))
+    last_tx_id: Mapped[int] = mapped_column(Integer)     # every WalletTx with id <= this is included
+    as_of: Mapped[datetime] = mapped_column(DateTime)    # newest created_at among the transactions folded in
+    balance: Mapped[float] = mapped_column(Float)        # sum of the owner's ledger up to last_tx_id
+    tx_count: Mapped[int] = mapped_column(Integer, default=0)   # transactions folded in since the previous checkpoint
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Iterable
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models.base import SessionLocal, sync_schema
+from models.backfill import BackfillWeek
+from models.game import Game
+from services.game_service import upsert_games, list_week_games
+from espn_cache import current_season_year
+import espn
+
+MAX_WORKERS = 6     # concurrent scoreboard requests during a backfill
+BATCH_SIZE = 250    # games buffered before each upsert transaction
+
+
+def ensure_schema():    # create tables if not exist
+    sync_schema()
+
+
+def completed_weeks(season_year: int) -> set[tuple[int, int]]:     # (seasontype, week) pairs already fully backfilled
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(BackfillWeek.season_type, BackfillWeek.week).where(BackfillWeek.season_year == season_year)
+        )
+        return {(st, wk) for st, wk in rows}
+
+
+def mark_weeks_complete(season_year: int, weeks: Iterable[tuple[int, int, int]]) -> None:   # record (seasontype, week, games) as done
+    rows = [
+        {"season_year": season_year, "season_type": st, "week": wk, "games": n, "completed_at": datetime.utcnow()}
+        for st, wk, n in weeks
+    ]
+    if not rows:
+        return
+    with SessionLocal() as db:
+        stmt = sqlite_insert(BackfillWeek.__table__).on_conflict_do_nothing()
+        db.execute(stmt, rows)
+        db.commit()
+
+
+def _fetch_week(season_year: int, season_type: int, week: int) -> list[Game]:    # one scoreboard call, parsed into transient Game rows
+    sb = espn.get_scoreboard(week=week, seasontype=season_type, dates=str(season_year))
+    return list(espn.parse_games(sb))
+
+
+def is_week_complete(games: list[Game], season_year: int) -> bool:    # every game final; empty weeks only count once the season is over
+    # postponed/canceled games are not final, so their week stays open and is refetched on the next backfill
+    if not games:
+        return season_year < datetime.utcnow().year
+    return len(espn.filter_previous_games(games)) == len(games)
+
+
+def backfill_season(
+    season_year: int = 2025,
+    max_workers: int = MAX_WORKERS,
+    batch_size: int = BATCH_SIZE,
+    force: bool = False,
+) -> dict:  # fetch every scoreboard week of a season concurrently and stream it into the games table
+    ensure_schema()
+    started = datetime.utcnow()
+    pairs = espn.iter_full_season_weeks(season_year)
+    done = set() if force else completed_weeks(season_year)
+    todo = [p for p in pairs if p not in done]
+
+    report = {
+        "season_year": season_year,
+        "weeks_total": len(pairs),
+        "weeks_skipped": len(pairs) - len(todo),
+        "weeks_fetched": 0,
+        "weeks_completed": 0,
+        "weeks_failed": [],
+        "inserted": 0,
+        "updated": 0,
+    }
+
+    buffer: list[Game] = []
+    finished: list[tuple[int, int, int]] = []
+
+    def _flush() -> None:
+        # games go in before their weeks are marked, so a crash only costs a refetch
+        inserted, updated = upsert_games(buffer)
+        report["inserted"] += inserted
+        report["updated"] += updated
+        mark_weeks_complete(season_year, finished)
+        report["weeks_completed"] += len(finished)
+        buffer.clear()
+        finished.clear()
+
+    if todo:
+        workers = max(1, min(max_workers, len(todo)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_fetch_week, season_year, st, wk): (st, wk) for st, wk in todo}
+            for fut in as_completed(futures):
+                st, wk = futures[fut]
+                try:
+                    games = fut.result()
+                except Exception:
+                    report["weeks_failed"].append((st, wk))
+                    continue
+                report["weeks_fetched"] += 1
+                buffer.extend(games)
+                if is_week_complete(games, season_year):
+                    finished.append((st, wk, len(games)))
+                if len(buffer) >= batch_size:
+                    _flush()
+        _flush()
+
+    report["seconds"] = round((datetime.utcnow() - started).total_seconds(), 2)
+    return report
+
+
+def final_games_for_week(week: int, season_type: int = 2, season_year: int | None = None) -> tuple[list[Game], str]:    # final games for a week; returns (games, source) where source is 'local', 'espn' or 'local-stale'
+    # the current season by the calendar, not the newest stored one: a backfill of a past year must not hide this season
+    season_year = season_year or current_season_year()
+    if (season_type, week) in completed_weeks(season_year):
+        return list_week_games(season_year, week, season_type, final_only=True), "local"
+
+    try:
+        sb = espn.get_scoreboard(week=week, seasontype=season_type, dates=str(season_year))
+    except Exception:
+        # offline: serve whatever finals of this season are already stored, if any
+        stored = list_week_games(season_year, week, season_type, final_only=True)
+        if not stored:
+            raise
+        return stored, "local-stale"
+
+    games = list(espn.parse_games(sb))
+    upsert_games(games)
+    year = next((g.season_year for g in games if g.season_year), season_year)
+    if games and is_week_complete(games, year):
+        mark_weeks_complete(year, [(season_type, week, len(games))])
+    return espn.filter_previous_games(games), "espn"
@@ -1,25 +1,45 @@
-from typing import Sequence
-from sqlalchemy import select
-from models.base import SessionLocal, Base, engine
-from models.bet import BetSlip, BetLeg, ALLOWED_LEGS
+import math
+from datetime import datetime
+from typing import Iterable, Sequence
+from sqlalchemy import select, insert, and_, or_
+from models.base import SessionLocal, ReadSessionLocal, sync_schema
+from models.bet import BetSlip, BetLeg, SlipStatus, LegResult, ALLOWED_LEGS
+from models.wallet import DEFAULT_OWNER
+
+PAGE_SIZE = 20
 
 def ensure_schema():    # create tables if not exist
-    Base.metadata.create_all(engine)
+    sync_schema()
     
-# (event_id, pick_team_name)
-def create_slip(legs_input: Sequence[tuple[str, str]], stake_tokens: float) -> tuple[BetSlip | None, str]:  
-    n = len(legs_input)
-    if n not in ALLOWED_LEGS:
+def _validate(legs_input: Sequence[tuple[str, str]], stake_tokens) -> tuple[float | None, str]:  # (stake, "OK") or (None, reason)
+    if len(legs_input) not in ALLOWED_LEGS:
         return None, f"Leg count must be one of {sorted(ALLOWED_LEGS)}."
+    if any(eid is None or team is None or not str(eid).strip() or not str(team).strip() for eid, team in legs_input):
+        return None, "Every leg needs an event id and a pick."
 
     try:
         stake = float(stake_tokens)
     except Exception:
         return None, "Stake must be a number."
+    if not math.isfinite(stake):
+        return None, "Stake must be a finite number."
     if stake <= 0:
         return None, "Stake must be > 0."
+    return stake, "OK"
+
+def leg_pair(leg) -> tuple[str, str]:  # (event_id, pick) from a 2-item list/tuple; a bare "ab" string must not unpack into a leg
+    if not isinstance(leg, (list, tuple)) or len(leg) != 2:
+        raise ValueError(f"leg {leg!r} is not an (event id, pick) pair")
+    return leg[0], leg[1]
 
-    slip = BetSlip(legs_count=n, stake_tokens=stake)  # status defaults to PENDING
+# (event_id, pick_team_name)
+def create_slip(legs_input: Sequence[tuple[str, str]], stake_tokens: float, owner: str = DEFAULT_OWNER) -> tuple[BetSlip | None, str]:  
+    stake, msg = _validate(legs_input, stake_tokens)
+    if stake is None:
+        return None, msg
+    n = len(legs_input)
+
+    slip = BetSlip(owner=owner, legs_count=n, stake_tokens=stake, wins=0, losses=0, pending_legs=n)  # status defaults to PENDING
     slip.legs = [BetLeg(event_id=eid, pick_team_name=team) for (eid, team) in legs_input]
 
     with SessionLocal() as db:
@@ -28,17 +48,95 @@ def create_slip(legs_input: Sequence[tuple[str, str]], stake_tokens: float) -> t
         db.refresh(slip)
         return slip, "OK"
 
-def list_pending_slips():   
+def create_slips(rows: Iterable[dict]) -> tuple[list[int], list[tuple[int, str]]]:  # validate and insert many slips with their legs in one transaction; returns (new slip ids, [(row index, reason)])
+    # row: {"legs": [(event_id, pick), ...], "stake": float, "owner": str?, "created_at": datetime?}
+    accepted: list[tuple[dict, list[tuple[str, str]]]] = []
+    rejects: list[tuple[int, str]] = []
+    for i, row in enumerate(rows):
+        try:
+            legs = [leg_pair(leg) for leg in (row.get("legs") or [])]
+        except (TypeError, ValueError):
+            rejects.append((i, "Every leg must be an (event id, pick) pair."))
+            continue
+        stake, msg = _validate(legs, row.get("stake"))
+        if stake is None:
+            rejects.append((i, msg))
+            continue
+        legs = [(str(eid).strip(), str(team).strip()) for eid, team in legs]  # only after None was rejected
+        n = len(legs)
+        slip = {
+            "owner": row.get("owner") or DEFAULT_OWNER,
+            "created_at": row.get("created_at") or datetime.utcnow(),
+            "legs_count": n,
+            "stake_tokens": stake,
+            "status": SlipStatus.PENDING,
+            "wins": 0,
+            "losses": 0,
+            "pending_legs": n,
+        }
+        accepted.append((slip, legs))
+    if not accepted:
+        return [], rejects
+
+    slips, legs_table = BetSlip.__table__, BetLeg.__table__
     with SessionLocal() as db:
-        stmt = select(BetSlip).where(BetSlip.status == "PENDING").order_by(BetSlip.created_at.asc())  
+        # executemany with RETURNING keeps the generated ids in parameter order, so legs can be matched up
+        ids = list(db.scalars(
+            insert(slips).returning(slips.c.id, sort_by_parameter_order=True),
+            [slip for slip, _legs in accepted],
+        ))
+        db.execute(insert(legs_table), [
+            {"slip_id": slip_id, "event_id": eid, "pick_team_name": team, "result": LegResult.PENDING}
+            for slip_id, (_slip, legs) in zip(ids, accepted)
+            for eid, team in legs
+        ])
+        db.commit()
+    return ids, rejects
+
+def _owned(stmt, owner: str | None):  # restrict a slip query to one account (None = every account)
+    return stmt if owner is None else stmt.where(BetSlip.owner == owner)
+
+def list_pending_slips(owner: str | None = None):   
+    with ReadSessionLocal() as db:
+        stmt = _owned(select(BetSlip).where(BetSlip.status == "PENDING"), owner).order_by(BetSlip.created_at.asc())  
         return list(db.scalars(stmt))  
     
-def list_settled_slips(limit: int = 50):
-    with SessionLocal() as db:
-        stmt = select(BetSlip).where(BetSlip.status == "SETTLED").order_by(BetSlip.created_at.desc()).limit(limit)
+def list_settled_slips(limit: int = 50, owner: str | None = None):
+    with ReadSessionLocal() as db:
+        stmt = _owned(select(BetSlip).where(BetSlip.status == "SETTLED"), owner).order_by(BetSlip.created_at.desc()).limit(limit)
         return list(db.scalars(stmt))
 
-def list_all_slips(limit: int = 50):
-    with SessionLocal() as db:
-        stmt = select(BetSlip).order_by(BetSlip.created_at.desc()).limit(limit)
+def list_all_slips(limit: int = 50, owner: str | None = None):
+    with ReadSessionLocal() as db:
+        stmt = _owned(select(BetSlip), owner).order_by(BetSlip.created_at.desc()).limit(limit)
         return list(db.scalars(stmt))
+
+def list_slips_page(
+    status: SlipStatus | str | None = None,
+    cursor: tuple[datetime, int] | None = None,
+    page_size: int = PAGE_SIZE,
+    newest_first: bool = True,
+    owner: str | None = None,
+) -> tuple[list[BetSlip], tuple[datetime, int] | None]:  # one keyset page on ([owner,] status, created_at, id); returns (slips, cursor for the next page or None)
+    stmt = _owned(select(BetSlip), owner)
+    if status is not None:
+        stmt = stmt.where(BetSlip.status == SlipStatus(getattr(status, "value", status)))
+    if cursor is not None:
+        created_at, slip_id = cursor
+        # seek past the last row of the previous page instead of OFFSET, so every page costs the same
+        if newest_first:
+            after = or_(BetSlip.created_at < created_at, and_(BetSlip.created_at == created_at, BetSlip.id < slip_id))
+        else:
+            after = or_(BetSlip.created_at > created_at, and_(BetSlip.created_at == created_at, BetSlip.id > slip_id))
+        stmt = stmt.where(after)
+    if newest_first:
+        stmt = stmt.order_by(BetSlip.created_at.desc(), BetSlip.id.desc())
+    else:
+        stmt = stmt.order_by(BetSlip.created_at.asc(), BetSlip.id.asc())
+    stmt = stmt.limit(page_size + 1)    # one extra row tells us whether another page exists
+
+    with ReadSessionLocal() as db:
+        rows = list(db.scalars(stmt))
+    page = rows[:page_size]
+    next_cursor = (page[-1].created_at, page[-1].id) if len(rows) > page_size else None
+    return page, next_cursor
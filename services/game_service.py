@@ -1,29 +1,122 @@
+from datetime import datetime, timezone
 from typing import Iterable
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, or_, func, update, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from models.base import SessionLocal, Base, engine
-from models.game import Game
+from models.base import SessionLocal, ReadSessionLocal, sync_schema
+from models.game import Game, FINAL_STATUS_PREFIX
 
+GAME_FIELDS = (
+    "event_id", "week", "season_year", "season_type", "status", "start",
+    "home_team", "away_team", "home_score", "away_score",
+)
+MUTABLE_FIELDS = tuple(f for f in GAME_FIELDS if f != "event_id")
+UPSERT_BATCH = 500  # rows per statement; keeps the IN (...) lookups under sqlite's bind limit
 
-def save_games(games: Iterable[Game]) -> int:   # returns number of new games
-    saved = 0
+
+def _game_row(g: Game) -> dict:    # plain column dict for a (possibly transient) Game
+    row = {f: getattr(g, f, None) for f in GAME_FIELDS}
+    row["event_id"] = str(row["event_id"])
+    return row
+
+
+def upsert_games(games: Iterable[Game]) -> tuple[int, int]:    # insert new games and refresh changed ones in one transaction; returns (inserted, updated)
+    rows: dict[str, dict] = {}
+    for g in games:
+        row = _game_row(g)
+        rows[row["event_id"]] = row     # last copy of a duplicated event wins
+    if not rows:
+        return 0, 0
+
+    ids = list(rows)
+    inserted = updated = 0
     with SessionLocal() as db:
-        for g in games:
-            try:
-                db.add(g)
-                db.commit()
-                saved += 1
-            except IntegrityError:
-                db.rollback()  
-    return saved
+        for start in range(0, len(ids), UPSERT_BATCH):
+            chunk = ids[start:start + UPSERT_BATCH]
+            cols = [getattr(Game, f) for f in GAME_FIELDS]
+            stored = {r[0]: dict(zip(GAME_FIELDS, r)) for r in db.execute(select(*cols).where(Game.event_id.in_(chunk)))}
+
+            # only send rows that are new or actually changed
+            batch = []
+            for eid in chunk:
+                old = stored.get(eid)
+                if old is None:
+                    inserted += 1
+                elif any(old[f] != rows[eid][f] for f in MUTABLE_FIELDS):
+                    updated += 1
+                else:
+                    continue
+                batch.append(rows[eid])
+            if not batch:
+                continue
+
+            stmt = sqlite_insert(Game.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Game.__table__.c.event_id],
+                set_={f: stmt.excluded[f] for f in MUTABLE_FIELDS},
+                where=or_(*(Game.__table__.c[f].is_distinct_from(stmt.excluded[f]) for f in MUTABLE_FIELDS)),
+            )
+            db.execute(stmt, batch)     # executemany within the single transaction
+        db.commit()
+    return inserted, updated
+
+
+def save_games(games: Iterable[Game]) -> int:   # returns number of new games
+    inserted, _updated = upsert_games(games)
+    return inserted
 
 
 def list_games(limit: int = 25):    # list upcoming games (default 25)
-    with SessionLocal() as db:
+    with ReadSessionLocal() as db:
         stmt = select(Game).order_by(Game.start).limit(limit)
         return list(db.scalars(stmt))
 
 
+def list_week_games(season_year: int, week: int, season_type: int = 2, final_only: bool = False) -> list[Game]:   # stored games for one scoreboard week, optionally only finished ones
+    stmt = select(Game).where(Game.season_year == season_year, Game.season_type == season_type, Game.week == week)
+    if final_only:
+        stmt = stmt.where(Game.status.startswith(FINAL_STATUS_PREFIX, autoescape=True))
+    with ReadSessionLocal() as db:
+        return list(db.scalars(stmt.order_by(Game.start)))
+
+
+def latest_season_year() -> int | None:     # newest season present in the local store
+    with ReadSessionLocal() as db:
+        return db.scalar(select(func.max(Game.season_year)))
+
+
+def parse_start(start: str | None) -> datetime | None:   # ESPN ISO kickoff ("2025-08-30T19:30Z") -> aware utc datetime
+    if not start:
+        return None
+    try:
+        dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def kickoff_times(event_ids: Iterable[str]) -> dict[str, datetime | None]:  # stored kickoff per event; None when the game is not stored
+    ids = {str(e) for e in event_ids}
+    out: dict[str, datetime | None] = dict.fromkeys(ids)
+    if not ids:
+        return out
+    with SessionLocal() as db:
+        for event_id, start in db.execute(select(Game.event_id, Game.start).where(Game.event_id.in_(ids))):
+            out[event_id] = parse_start(start)
+    return out
+
+
+def update_statuses(statuses: dict[str, str]) -> None:  # refresh the stored status of already-stored games in one transaction
+    if not statuses:
+        return
+    games = Game.__table__
+    with SessionLocal() as db:
+        db.execute(
+            update(games).where(games.c.event_id == bindparam("eid")).values(status=bindparam("new_status")),
+            [{"eid": eid, "new_status": st} for eid, st in statuses.items()],
+        )
+        db.commit()
+
+
 def ensure_schema():    # create tables if not exist
-    Base.metadata.create_all(engine)
+    sync_schema()
@@ -1,26 +1,38 @@
+from datetime import datetime
 from typing import Iterable
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, insert, func
 
-from models.base import SessionLocal, Base, engine
+from models.base import SessionLocal, ReadSessionLocal, sync_schema
 from models.ranking import Ranking
 
+RANKING_FIELDS = (
+    "poll", "season_year", "week", "rank", "team_name", "team_abbr",
+    "previous", "points", "first_place_votes",
+)
 
-def replace_rankings(new_ranks: Iterable[Ranking]):  # replace existing rankings with new ones
+
+def replace_rankings(new_ranks: Iterable[Ranking]) -> int:  # replace stored poll snapshots with new ones; returns rows written
+    fetched_at = datetime.utcnow()
+    rows = [{**{f: getattr(r, f) for f in RANKING_FIELDS}, "fetched_at": fetched_at} for r in new_ranks]
+    if not rows:
+        return 0
+    snapshots = {(r["poll"], r["season_year"], r["week"]) for r in rows}
     with SessionLocal() as db:
-        for r in new_ranks:
+        for poll, season_year, week in snapshots:   # one delete per (poll, season, week), not per row
             db.execute(
                 delete(Ranking).where(
-                    (Ranking.season_year == r.season_year) &
-                    (Ranking.week == r.week) &
-                    (Ranking.poll == r.poll)
+                    (Ranking.poll == poll) &
+                    (Ranking.season_year == season_year) &
+                    (Ranking.week == week)
                 )
             )
-            db.add(r)
+        db.execute(insert(Ranking), rows)
         db.commit()
+    return len(rows)
 
 
 def get_rankings(poll: str | None = None, season_year: int | None = None, week: int | None = None): # get rankings with optional filters
-    with SessionLocal() as db:
+    with ReadSessionLocal() as db:
         stmt = select(Ranking)
         if poll:
             stmt = stmt.where(Ranking.poll == poll)
@@ -32,5 +44,14 @@ def get_rankings(poll: str | None = None, season_year: int | None = None, week:
         return list(db.scalars(stmt))
 
 
+def latest_snapshot(since: datetime | None = None) -> list[Ranking]:   # rows from the most recent download, if it happened at/after `since` (naive utc)
+    with ReadSessionLocal() as db:
+        fetched_at = db.scalar(select(func.max(Ranking.fetched_at)))
+        if fetched_at is None or (since is not None and fetched_at < since):
+            return []
+        stmt = select(Ranking).where(Ranking.fetched_at == fetched_at).order_by(Ranking.poll, Ranking.rank.asc())
+        return list(db.scalars(stmt))
+
+
 def ensure_schema():
-    Base.metadata.create_all(engine)
+    sync_schema()
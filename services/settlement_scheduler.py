@@ -0,0 +1,99 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from services.game_service import kickoff_times
+from services.settlement_service import pending_event_ids, settle
+from services.wallet_service import CHECKPOINT_EVERY, checkpoint
+
+EARLIEST_FINAL = timedelta(hours=2, minutes=30)     # no game is final sooner than this after kickoff
+EXPECTED_DURATION = timedelta(hours=3, minutes=30)  # typical kickoff -> final
+OVERTIME_WINDOW = timedelta(hours=2)                # keep polling fast this long past the expected end
+MIN_INTERVAL = timedelta(minutes=2)                 # fastest polling, right around the expected end
+MAX_INTERVAL = timedelta(minutes=30)                # slowest polling (early in a game, or long delays)
+UNKNOWN_KICKOFF_INTERVAL = timedelta(minutes=15)    # events whose kickoff is not stored locally
+IDLE_INTERVAL = timedelta(minutes=10)               # how often to look for new pending slips
+PASS_BUDGET = 30.0                                  # seconds per background settlement pass
+
+
+def _poll_interval(kickoff: datetime | None, at: datetime) -> timedelta:    # gap between checks; shrinks as the expected end approaches
+    if kickoff is None:
+        return UNKNOWN_KICKOFF_INTERVAL
+    to_end = kickoff + EXPECTED_DURATION - at
+    if to_end > timedelta(0):
+        return min(MAX_INTERVAL, max(MIN_INTERVAL, to_end / 3))
+    # past the expected end: overtime and weather delays are checked often, postponements rarely
+    return MIN_INTERVAL if -to_end < OVERTIME_WINDOW else MAX_INTERVAL
+
+
+def next_check_at(kickoff: datetime | None, last_checked: datetime | None, now: datetime) -> datetime:  # when an event is next worth asking ESPN about
+    if kickoff is not None and now < kickoff + EARLIEST_FINAL:
+        return kickoff + EARLIEST_FINAL     # nothing to do before the game could possibly be over
+    if last_checked is None:
+        return now
+    return last_checked + _poll_interval(kickoff, last_checked)
+
+
+class SettlementScheduler(threading.Thread):    # background daemon that settles pending slips on a kickoff-driven schedule
+    def __init__(self, budget: float = PASS_BUDGET, idle_interval: timedelta = IDLE_INTERVAL):
+        super().__init__(name="settlement-scheduler", daemon=True)
+        self.budget = budget
+        self.idle_interval = idle_interval
+        self.last_report: dict | None = None
+        self.last_error: Exception | None = None
+        self._last_checked: dict[str, datetime] = {}
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+
+    def plan(self, now: datetime) -> dict[str, datetime]:  # event_id -> next check time for every pending event
+        pending = pending_event_ids()
+        # forget events that are no longer pending (final, moot or canceled)
+        self._last_checked = {eid: t for eid, t in self._last_checked.items() if eid in pending}
+        return {
+            eid: next_check_at(kickoff, self._last_checked.get(eid), now)
+            for eid, kickoff in kickoff_times(pending).items()
+        }
+
+    def run_once(self, now: datetime | None = None) -> datetime:   # settle whatever is due; returns when to wake next
+        now = now or datetime.now(timezone.utc)
+        plan = self.plan(now)
+        due = [eid for eid, at in plan.items() if at <= now]
+        if due:
+            self.last_report = settle(budget=self.budget, event_ids=due)
+            for eid in due:
+                self._last_checked[eid] = now
+            plan = self.plan(now)
+            checkpoint(min_tail=CHECKPOINT_EVERY)   # payouts grow the ledger; keep balance_at/reconcile tails bounded
+        upcoming = [at for at in plan.values() if at > now]
+        return min(upcoming + [now + self.idle_interval])
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                wake_at = self.run_once()
+                self.last_error = None
+            except Exception as e:  # a bad pass must not kill the thread; retry after the idle interval
+                self.last_error = e
+                wake_at = datetime.now(timezone.utc) + self.idle_interval
+            delay = max(1.0, (wake_at - datetime.now(timezone.utc)).total_seconds())
+            self._wake.wait(timeout=delay)
+            self._wake.clear()
+
+    def poke(self) -> None:     # re-plan now, e.g. after a slip is created
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake.set()
+
+
+_scheduler: SettlementScheduler | None = None
+
+def start_scheduler(**kwargs) -> SettlementScheduler:  # start the shared background scheduler once per process
+    global _scheduler
+    if _scheduler is None or not _scheduler.is_alive():
+        _scheduler = SettlementScheduler(**kwargs)
+        _scheduler.start()
+    return _scheduler
+
+def get_scheduler() -> SettlementScheduler | None:
+    return _scheduler
@@ -1,69 +1,136 @@
-from sqlalchemy import select
-from models.base import SessionLocal, Base, engine
-from models.bet import BetSlip, BetLeg, SlipStatus, LegResult
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+from sqlalchemy import select, update, delete, bindparam
+from models.base import SessionLocal, sync_schema
+from models.bet import BetSlip, BetLeg, SlipStatus, LegResult, PAYOUT_MULTIPLIERS, recount_progress
+from models.game import Game
+from services.game_service import parse_start, update_statuses
 import espn
 
 CREDIT_ON_WIN = False   # set to True to enable automatic crediting on wins (for testing/demo can be enabled later)
-
-def _credit_if_enabled(amount: float, reason: str): # credit wallet if enabled
-    if not CREDIT_ON_WIN:
-        return
-    from services.wallet_service import credit
-    credit(amount, reason)
+MAX_FETCH_WORKERS = 8   # upper bound on concurrent ESPN summary requests during a settlement pass
+CALL_TIMEOUT = 10.0     # seconds any single ESPN request may take during settlement, retries included
+LOCK_WINDOW = timedelta(minutes=15)     # legs this close to kickoff are re-checked against ESPN before a cancel
+LOCK_REFRESH_BUDGET = 5.0               # seconds the batched lock refresh may take
 
 def ensure_schema():    # create tables if not exist
-    Base.metadata.create_all(engine)
+    sync_schema()
     
-def _all_legs_pre_game(slip: BetSlip) -> tuple[bool, str | None]:   # check if all legs are pre-game
-    legs = getattr(slip, "legs", []) or []
-    if not legs:
-        return True, None
-
-    for leg in legs:
-        try:    # use espn.py helper to get game summary
-            summary = espn.get_summary(leg.event_id)
+def lock_reasons(event_ids: Iterable[str], now: datetime | None = None) -> dict[str, str | None]:  # event_id -> why its legs are locked, or None if the game is safely pre-game
+    ids = {str(e) for e in event_ids}
+    now = now or datetime.now(timezone.utc)
+    reasons: dict[str, str | None] = {}
+    refresh: list[str] = []
+
+    with SessionLocal() as db:
+        games = {g.event_id: g for g in db.scalars(select(Game).where(Game.event_id.in_(ids)))}
+    for event_id in ids:
+        game = games.get(event_id)
+        if game is not None and game.status and not espn.filter_upcoming_games([game]):
+            reasons[event_id] = f"game is '{game.status}'"
+            continue
+        kickoff = parse_start(game.start) if game is not None else None
+        if kickoff is None or now >= kickoff - LOCK_WINDOW:
+            refresh.append(event_id)    # unknown or close to kickoff: ask ESPN
+        else:
+            reasons[event_id] = None    # stored as upcoming and comfortably before kickoff
+
+    if refresh:
+        fetched = espn.gather_summaries(refresh, deadline=CALL_TIMEOUT, budget=LOCK_REFRESH_BUDGET)
+        statuses: dict[str, str] = {}
+        for event_id in refresh:
+            summary = fetched.get(event_id)
+            if not isinstance(summary, dict):
+                reasons[event_id] = f"could not verify game: {summary}"
+                continue
             comps = (summary.get("header") or {}).get("competitions") or []
-            comp = comps[0] if comps else {}
-            state = (((comp.get("status") or {}).get("type") or {}).get("state") or "").lower()
+            status_type = ((comps[0] if comps else {}).get("status") or {}).get("type") or {}
             # ESPN values: 'pre' (not started), 'in' (in progress), 'post' (finished)
-            if state != "pre":
-                return False, f"leg {getattr(leg, 'id', '?')} is '{state}'"
-        except Exception as e:
-            return False, f"could not verify leg {getattr(leg, 'id', '?')}: {e}"
-    return True, None
+            state = (status_type.get("state") or "").lower()
+            reasons[event_id] = None if state == "pre" else f"game is '{state or 'unknown'}'"
+            if status_type.get("description"):
+                statuses[event_id] = status_type["description"]
+        try:
+            update_statuses(statuses)   # keep the stored game state warm for the next lock check
+        except Exception:
+            pass
+    return reasons
+
+
+def _pending_slip_events(slip_ids: Iterable[int] | None = None, owner: str | None = None) -> dict[int, list[str]]:    # pending slip id -> its legs' event ids
+    out: dict[int, list[str]] = {}
+    with SessionLocal() as db:
+        stmt = (
+            select(BetSlip.id, BetLeg.event_id)
+            .outerjoin(BetLeg, BetLeg.slip_id == BetSlip.id)
+            .where(BetSlip.status == SlipStatus.PENDING)
+        )
+        if slip_ids is not None:
+            stmt = stmt.where(BetSlip.id.in_(set(slip_ids)))
+        if owner is not None:
+            stmt = stmt.where(BetSlip.owner == owner)
+        for slip_id, event_id in db.execute(stmt):
+            events = out.setdefault(slip_id, [])
+            if event_id is not None:
+                events.append(event_id)
+    return out
 
 
-def cancel_pending_slip(slip_id: int) -> tuple[bool, str]:  # cancel a pending slip if all legs are pre-game
+def _delete_pending_slips(slip_ids: list[int]) -> list[int]:   # delete slips (and legs) still pending, in one transaction; returns ids removed
+    if not slip_ids:
+        return []
+    with SessionLocal() as db:
+        still_pending = list(db.scalars(
+            select(BetSlip.id).where(BetSlip.id.in_(slip_ids), BetSlip.status == SlipStatus.PENDING)
+        ))
+        if still_pending:
+            # delete legs first; sqlite does not enforce the cascade by default
+            db.execute(delete(BetLeg).where(BetLeg.slip_id.in_(still_pending)))
+            db.execute(delete(BetSlip).where(BetSlip.id.in_(still_pending), BetSlip.status == SlipStatus.PENDING))
+        db.commit()
+    return still_pending
+
+
+def cancel_pending_slip(slip_id: int, owner: str | None = None) -> tuple[bool, str]:  # cancel a pending slip if all legs are pre-game; owner limits it to that account's slips
     with SessionLocal() as db:
         slip = db.get(BetSlip, slip_id)
-        if not slip:
+        if not slip or (owner is not None and slip.owner != owner):
             return False, "Slip not found."
-
         status_val = getattr(slip.status, "value", str(slip.status)).upper()
         if status_val != "PENDING":
             return False, "Slip is not pending and cannot be canceled."
 
-        ok, reason = _all_legs_pre_game(slip)
-        if not ok:
-            return False, f"Slip is locked (game underway or finished): {reason or ''}"
+    events = _pending_slip_events([slip_id]).get(slip_id, [])
+    reasons = lock_reasons(events)
+    locked = next(((eid, r) for eid, r in reasons.items() if r), None)
+    if locked:
+        return False, f"Slip is locked (game underway or finished): event {locked[0]} {locked[1]}"
 
-        try:
-            # delete legs first unless cascade is configured.
-            for leg in list(getattr(slip, "legs", []) or []):
-                db.delete(leg)
-            db.delete(slip)
-            db.commit()
-            return True, f"Slip #{slip_id} canceled."
-        except Exception as e:
-            db.rollback()
-            return False, f"Failed to cancel slip: {e}"
+    try:
+        if not _delete_pending_slips([slip_id]):
+            return False, "Slip is no longer pending and cannot be canceled."
+        return True, f"Slip #{slip_id} canceled."
+    except Exception as e:
+        return False, f"Failed to cancel slip: {e}"
 
 
-def _winner_from_summary(summary_json: dict) -> tuple[str | None, bool]:    # extract winner team name and finality from espn summary JSON
-    comps = (summary_json.get("header") or {}).get("competitions") or []
-    if not comps:
-        return None, False
-    comp = comps[0]
+def cancel_all_cancellable(owner: str | None = None) -> tuple[list[int], dict[int, str]]:  # cancel every pending slip (of one account, if given) whose games are all pre-game; returns (canceled ids, {locked id: reason})
+    slips = _pending_slip_events(owner=owner)
+    reasons = lock_reasons({eid for events in slips.values() for eid in events})
+
+    cancellable: list[int] = []
+    locked: dict[int, str] = {}
+    for slip_id, events in slips.items():
+        why = next((f"event {eid} {reasons[eid]}" for eid in events if reasons.get(eid)), None)
+        if why:
+            locked[slip_id] = why
+        else:
+            cancellable.append(slip_id)
+    return sorted(_delete_pending_slips(cancellable)), locked
+
+
+def _winner_from_competition(comp: dict) -> tuple[str | None, bool]:  # extract winner team name and finality from one espn competition object
     status = ((comp.get("status") or {}).get("type") or {}).get("state")
     is_final = (status or "").lower() == "post"
 
@@ -76,56 +143,267 @@ def _winner_from_summary(summary_json: dict) -> tuple[str | None, bool]:    # ex
             break
     return winner, is_final
 
+def _winner_from_summary(summary_json: dict) -> tuple[str | None, bool]:    # extract winner team name and finality from espn summary JSON
+    comps = (summary_json.get("header") or {}).get("competitions") or []
+    if not comps:
+        return None, False
+    return _winner_from_competition(comps[0])
+
+def _results_from_scoreboard(sb_json: dict) -> dict[str, tuple[str | None, bool]]:  # map event_id -> (winner, is_final) for a whole scoreboard slate
+    out = {}
+    for ev in (sb_json.get("events") or []):
+        comps = ev.get("competitions") or []
+        if ev.get("id") and comps:
+            out[str(ev["id"])] = _winner_from_competition(comps[0])
+    return out
+
 def _payout_multiplier(legs: int) -> float:  # simple fixed odds based on legs count
-    return {1: 1.9, 3: 5.0, 5: 12.0, 7: 25.0}.get(legs, 1.0)
+    return PAYOUT_MULTIPLIERS.get(legs, 1.0)
 
-def check_and_settle() -> tuple[int, int]:      # check all pending slips and settle if possible; returns (checked, settled) counts
-    checked = 0
-    settled = 0
+def _fetch_summaries(event_ids: Iterable[str], max_workers: int = MAX_FETCH_WORKERS, call_timeout: float = CALL_TIMEOUT, budget: float | None = None) -> dict[str, dict | None]:  # fetch each distinct event summary once, concurrently; failed fetches map to None
+    ids = sorted({str(e) for e in event_ids if e})
+    if not ids:
+        return {}
 
+    fetched = espn.gather_summaries(ids, max_concurrency=max(1, min(max_workers, len(ids))), deadline=call_timeout, budget=budget)
+    # failed or timed-out events stay unresolved; they are retried on the next pass
+    return {eid: (res if isinstance(res, dict) else None) for eid, res in fetched.items()}
+
+def _bucket_events(event_ids: Iterable[str]) -> dict[tuple[int | None, int, int], set[str]]:   # group events by their stored (season_year, seasontype, week) scoreboard
+    ids = set(event_ids)
+    if not ids:
+        return {}
+    buckets: dict[tuple[int | None, int, int], set[str]] = {}
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(Game.event_id, Game.season_year, Game.season_type, Game.week).where(Game.event_id.in_(ids))
+        )
+        for event_id, season_year, season_type, week in rows:
+            if season_type is None or week is None:
+                continue    # unknown bucket; resolved through the summary fallback
+            buckets.setdefault((season_year, season_type, week), set()).add(event_id)
+    return buckets
+
+def _fetch_scoreboard_results(buckets: Iterable[tuple[int | None, int, int]], max_workers: int = MAX_FETCH_WORKERS, call_timeout: float = CALL_TIMEOUT, budget: float | None = None) -> dict[str, tuple[str | None, bool]]:  # one scoreboard call per bucket, concurrently
+    slates = [(week, season_type, str(season_year) if season_year else None) for season_year, season_type, week in buckets]
+    if not slates:
+        return {}
+
+    fetched = espn.gather_scoreboards(slates, max_concurrency=max(1, min(max_workers, len(slates))), deadline=call_timeout, budget=budget)
+    out: dict[str, tuple[str | None, bool]] = {}
+    for sb in fetched.values():
+        if isinstance(sb, dict):    # a failed bucket falls back to per-event summaries
+            out.update(_results_from_scoreboard(sb))
+    return out
+
+def _pending_index(event_ids: Iterable[str] | None = None) -> dict[str, set[int]]:   # phase 1: event_id -> pending slips with an unresolved leg on that event
+    index: dict[str, set[int]] = {}
+    with SessionLocal() as db:
+        stmt = (
+            select(BetLeg.event_id, BetLeg.slip_id)
+            .join(BetSlip, BetSlip.id == BetLeg.slip_id)
+            .where(BetLeg.result == LegResult.PENDING, BetSlip.status == SlipStatus.PENDING)
+        )
+        if event_ids is not None:
+            stmt = stmt.where(BetLeg.event_id.in_({str(e) for e in event_ids}))
+        for event_id, slip_id in db.execute(stmt):
+            index.setdefault(event_id, set()).add(slip_id)
+    return index
+
+def pending_event_ids() -> set[str]:    # events that still have an unresolved leg on a pending slip
+    return set(_pending_index())
+
+def _load_slips(slip_ids: Iterable[int]) -> dict[int, dict]:  # read-only snapshot of the given pending slips and all their legs, in one query
+    ids = set(slip_ids)
+    slips: dict[int, dict] = {}
+    if not ids:
+        return slips
     with SessionLocal() as db:
-        slips = list(db.scalars(select(BetSlip).where(BetSlip.status == SlipStatus.PENDING)))   # get all pending slips
-        for slip in slips:
-            checked += 1
-            all_final = True
-            wins = losses = 0
-
-            for leg in slip.legs:   # check each leg
-                if leg.result in (LegResult.WIN, LegResult.LOSS):   # already decided
-                    if leg.result == LegResult.WIN:
-                        wins += 1
-                    else:
-                        losses += 1
-                    continue
-
-                summary_json = espn.get_summary(leg.event_id)  # your espn.py helper
-                winner, is_final = _winner_from_summary(summary_json)
-                if not is_final:
-                    all_final = False
-                    continue
-
-                if winner and (winner == leg.pick_team_name):   # user picked correctly
-                    leg.result = LegResult.WIN
-                    wins += 1
-                else:
-                    leg.result = LegResult.LOSS # user picked incorrectly or no winner found
-                    losses += 1
-                db.add(leg)
-
-            if all_final:
-                needed = (slip.legs_count // 2) + 1     # strictly more than 50%
-                if wins >= needed:
-                    slip.status = SlipStatus.WON
-                    if CREDIT_ON_WIN:   # auto credit if enabled
-                        payout = round(slip.stake_tokens * _payout_multiplier(slip.legs_count), 2)
-                        _credit_if_enabled(payout, f"Payout for {slip.legs_count}-leg slip #{slip.id}")
-                else:
-                    slip.status = SlipStatus.LOST
-                slip.status = SlipStatus.SETTLED
-                settled += 1
-
-            db.add(slip)
+        stmt = (
+            select(
+                BetSlip.id, BetSlip.owner, BetSlip.legs_count, BetSlip.stake_tokens,
+                BetLeg.id, BetLeg.event_id, BetLeg.pick_team_name, BetLeg.result,
+            )
+            .join(BetLeg, BetLeg.slip_id == BetSlip.id)
+            .where(BetSlip.id.in_(ids), BetSlip.status == SlipStatus.PENDING)
+        )
+        for slip_id, owner, legs_count, stake, leg_id, event_id, pick, result in db.execute(stmt):
+            slip = slips.setdefault(slip_id, {"owner": owner, "legs_count": legs_count, "stake": stake, "legs": []})
+            slip["legs"].append({"id": leg_id, "event_id": event_id, "pick": pick, "result": result})
+    return slips
+
+def _resolve_events(
+    index: dict[str, set[int]],
+    max_workers: int = MAX_FETCH_WORKERS,
+    use_scoreboard: bool = True,
+    call_timeout: float = CALL_TIMEOUT,
+    deadline_at: float | None = None,
+) -> tuple[dict[str, tuple[str | None, bool]], dict[int, dict]]:  # phase 2: returns (event_id -> (winner, is_final), slips touched by final events)
+    results: dict[str, tuple[str | None, bool]] = {}
+    slips: dict[int, dict] = {}
+
+    def _remaining() -> float | None:  # seconds left in the pass budget (None = unbounded)
+        return None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+
+    def _absorb(new_results: dict[str, tuple[str | None, bool]]) -> None:
+        results.update(new_results)
+        # only slips with a leg on a newly final game are loaded; everything else stays untouched
+        touched = set()
+        for event_id, (_winner, is_final) in new_results.items():
+            if is_final:
+                touched |= index.get(event_id, set())
+        slips.update(_load_slips(touched - slips.keys()))
+
+    def _still_open(event_id: str) -> bool:    # some slip waiting on this event is not decided yet
+        return any(sid not in slips or _tally(slips[sid], results)[2] is None for sid in index[event_id])
+
+    if use_scoreboard and _remaining() != 0:
+        slate = _fetch_scoreboard_results(_bucket_events(index), max_workers, call_timeout, _remaining())
+        _absorb({eid: res for eid, res in slate.items() if eid in index})
+
+    # events not on any fetched scoreboard go through the per-event summary,
+    # skipping slips the scoreboard results already decided
+    missing = [eid for eid in index if eid not in results and _still_open(eid)]
+    if missing and _remaining() != 0:
+        _absorb({
+            event_id: _winner_from_summary(summary)
+            for event_id, summary in _fetch_summaries(missing, max_workers, call_timeout, _remaining()).items()
+            if summary is not None
+        })
+    return results, slips
 
+def _tally(slip: dict, results: dict[str, tuple[str | None, bool]]) -> tuple[list[dict], list[dict], bool | None]:   # returns (leg updates, still-open legs, won) where won is None while undecided
+    leg_updates: list[dict] = []
+    open_legs: list[dict] = []
+    wins = 0
+
+    for leg in slip["legs"]:   # check each leg
+        if leg["result"] != LegResult.PENDING:   # already decided (or moot)
+            wins += leg["result"] == LegResult.WIN
+            continue
+
+        winner, is_final = results.get(leg["event_id"], (None, False))
+        if not is_final:
+            open_legs.append(leg)
+            continue
+
+        if winner and (winner == leg["pick"]):   # user picked correctly
+            result = LegResult.WIN
+            wins += 1
+        else:
+            result = LegResult.LOSS # user picked incorrectly or no winner found
+        leg_updates.append({"leg_id": leg["id"], "new_result": result})
+
+    needed = (slip["legs_count"] // 2) + 1     # strictly more than 50%
+    if wins >= needed:
+        won = True
+    elif wins + len(open_legs) < needed:    # threshold unreachable even if every open leg wins
+        won = False
+    else:
+        won = None
+    return leg_updates, open_legs, won
+
+def _decide(slips: dict[int, dict], results: dict[str, tuple[str | None, bool]]) -> tuple[list[dict], list[tuple[int, bool]]]:  # apply event results to the snapshot; returns (leg updates, [(slip_id, won)])
+    leg_updates: list[dict] = []
+    decided: list[tuple[int, bool]] = []
+    for slip_id, slip in slips.items():
+        updates, open_legs, won = _tally(slip, results)
+        leg_updates.extend(updates)
+        if won is None:
+            continue
+        # outcome is locked in; legs that can no longer change it are not tracked any further
+        leg_updates.extend({"leg_id": leg["id"], "new_result": LegResult.MOOT} for leg in open_legs)
+        decided.append((slip_id, won))
+    return leg_updates, decided
+
+def _payouts(slips: dict[int, dict], decided: list[tuple[int, bool]]) -> dict[int, tuple[str, float, str]]:   # slip_id -> (owner, amount, reason) for every winning slip
+    payouts = {}
+    for slip_id, won in decided:
+        if won:
+            slip = slips[slip_id]
+            payout = round(slip["stake"] * _payout_multiplier(slip["legs_count"]), 2)
+            payouts[slip_id] = (slip["owner"], payout, f"Payout for {slip['legs_count']}-leg slip #{slip_id}")
+    return payouts
+
+def _apply(
+    leg_updates: list[dict],
+    decided: list[tuple[int, bool]],
+    touched: Iterable[int] = (),
+    payouts: dict[int, tuple[str, float, str]] | None = None,
+) -> list[tuple[int, bool]]:   # phase 3: one short write transaction; returns the slips this pass actually settled
+    if not leg_updates and not decided:
+        return []
+    legs = BetLeg.__table__
+    slips = BetSlip.__table__
+    settled: list[tuple[int, bool]] = []
+    with SessionLocal() as db:
+        if leg_updates:
+            # only legs still pending are written; a concurrent pass may have beaten us
+            db.execute(
+                update(legs)
+                .where(legs.c.id == bindparam("leg_id"), legs.c.result == LegResult.PENDING)
+                .values(result=bindparam("new_result")),
+                leg_updates,
+            )
+            # keep the per-slip progress counters in step with the legs, in the same transaction
+            db.execute(recount_progress(touched))
+        for slip_id, won in decided:
+            # optimistic check: skip slips that were canceled or settled since the snapshot
+            res = db.execute(
+                update(slips)
+                .where(slips.c.id == slip_id, slips.c.status == SlipStatus.PENDING)
+                .values(status=SlipStatus.SETTLED)
+            )
+            if res.rowcount == 1:
+                settled.append((slip_id, won))
+        if payouts:
+            # credited in the settling transaction, so a slip is paid exactly when it flips to SETTLED
+            from services.wallet_service import apply_credits
+            apply_credits(db, [payouts[sid] for sid, won in settled if won and sid in payouts])
         db.commit()
+    return settled
+
+def settle(
+    max_workers: int = MAX_FETCH_WORKERS,
+    use_scoreboard: bool = True,
+    budget: float | None = None,
+    call_timeout: float = CALL_TIMEOUT,
+    event_ids: Iterable[str] | None = None,
+) -> dict:  # one settlement pass within an optional time budget (seconds), optionally limited to some events; commits what it resolved and reports the rest as deferred
+    started = time.monotonic()
+    deadline_at = started + budget if budget is not None else None
+
+    index = _pending_index(event_ids)
+    checked = len(set().union(*index.values())) if index else 0
+
+    # phase 2: network with no session open; every event that can still matter is resolved once
+    results, slips = _resolve_events(index, max_workers, use_scoreboard, call_timeout, deadline_at)
+
+    leg_updates, decided = _decide(slips, results)
+    payouts = _payouts(slips, decided) if CREDIT_ON_WIN else None
+    settled = _apply(leg_updates, decided, slips.keys(), payouts)
+
+    # events with no answer this pass (failures, timeouts, open breaker) are picked up by the next one
+    decided_ids = {sid for sid, _won in decided}
+    deferred = sorted(
+        eid for eid, sids in index.items()
+        if eid not in results and (sids - decided_ids)
+    )
+    return {
+        "checked": checked,
+        "settled": len(settled),
+        "events": len(index),
+        "resolved": len(results),
+        "deferred": deferred,
+        "circuit_open": espn.get_client().breaker.is_open,
+        "seconds": round(time.monotonic() - started, 2),
+    }
 
-    return checked, settled
+def check_and_settle(
+    max_workers: int = MAX_FETCH_WORKERS,
+    use_scoreboard: bool = True,
+    budget: float | None = None,
+    call_timeout: float = CALL_TIMEOUT,
+) -> tuple[int, int]:      # check all pending slips and settle if possible; returns (checked, settled) counts
+    report = settle(max_workers, use_scoreboard, budget, call_timeout)
+    return report["checked"], report["settled"]
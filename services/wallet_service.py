@@ -1,89 +1,147 @@
-from sqlalchemy import select
-from models.base import SessionLocal, Base, engine
-from models.wallet import Wallet, WalletTx
+from typing import Iterable
+from sqlalchemy import select, insert, update, func, literal, bindparam, and_, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models.base import SessionLocal, ReadSessionLocal, sync_schema
+from models.wallet import Wallet, WalletTx, WalletCheckpoint, DEFAULT_OWNER
 from datetime import datetime
+import os
 
-DEFAULT_OWNER = "default"
+ACTIVE_OWNER = os.environ.get("CFB_OWNER") or DEFAULT_OWNER  # account the interactive cli acts for
+CHECKPOINT_EVERY = 500  # ledger rows an owner may accumulate before the scheduler folds them into a checkpoint
+DRIFT_TOLERANCE = 0.005 # balances within half a cent of the ledger count as reconciled
 
 
 def ensure_schema():
-    Base.metadata.create_all(engine)
+    sync_schema()
 
 
-def _get_wallet(db, owner: str = DEFAULT_OWNER) -> Wallet:  # get or create wallet for owner
-    w = db.scalar(select(Wallet).where(Wallet.owner == owner))
-    if not w:
-        w = Wallet(owner=owner, balance=0.0)
-        db.add(w)
+def _open(db, owner: str) -> None:    # make sure owner has a wallet row, inside the caller's transaction
+    db.execute(
+        sqlite_insert(Wallet.__table__)
+        .values(owner=owner, balance=0.0)
+        .on_conflict_do_nothing(index_elements=["owner"])
+    )
+
+
+def _amount(amount) -> float | None:   # positive float or None
+    try:
+        amt = float(amount)
+    except Exception:
+        return None
+    return amt if amt > 0 else None
+
+
+def ensure_wallet(initial_amount: float, owner: str = DEFAULT_OWNER) -> None:  # seed a wallet with a starting balance only if it doesn't exist yet
+    with SessionLocal() as db:
+        if db.scalar(select(Wallet.id).where(Wallet.owner == owner)) is not None:
+            return
+        amount = float(initial_amount)
+        db.add(Wallet(owner=owner, balance=amount))
+        db.add(WalletTx(owner=owner, amount=amount, reason=f"Wallet opened with {amount:.2f}"))
         db.commit()
-        db.refresh(w)
-    return w
 
 
 def reset_wallet(target_amount: float, owner: str = DEFAULT_OWNER) -> None:     # reset wallet balance to target amount (for testing/demo purposes)
+    target = float(target_amount)
+    wallets = Wallet.__table__
     with SessionLocal() as db:
-        w = _get_wallet(db, owner)
-        target = float(target_amount)
-        current = float(w.balance or 0.0)
-        delta = round(target - current, 2)
-        if abs(delta) < 1e-9:
-            return  # already at target
-        w.balance = target
-        if delta != 0.0:
-            db.add(WalletTx(
-                created_at=datetime.utcnow(),
-                owner=owner,
-                amount=delta,
-                reason=f"Wallet reset to {target:.2f}"
-            ))
-        db.add(w)
+        _open(db, owner)
+        # the ledger row takes its delta from the balance it replaces, in the same transaction as the update
+        db.execute(
+            insert(WalletTx.__table__).from_select(
+                ["created_at", "owner", "amount", "reason"],
+                select(
+                    literal(datetime.utcnow()),
+                    wallets.c.owner,
+                    func.round(target - wallets.c.balance, 2),
+                    literal(f"Wallet reset to {target:.2f}"),
+                ).where(wallets.c.owner == owner, func.abs(wallets.c.balance - target) >= 1e-9),
+            )
+        )
+        db.execute(update(wallets).where(wallets.c.owner == owner).values(balance=target))
         db.commit()
 
 
 def credit(amount: float, reason: str = "", owner: str = DEFAULT_OWNER) -> bool:   # credit wallet by amount; returns success
-    try:
-        amt = float(amount)
-    except Exception:
-        return False
-    if amt <= 0:
+    amt = _amount(amount)
+    if amt is None:
         return False
 
+    wallets = Wallet.__table__
     with SessionLocal() as db:
-        w = _get_wallet(db, owner)
-        w.balance = float(w.balance) + amt
-        db.add(WalletTx(owner=owner, amount=amt, reason=reason or "credit"))
-        db.add(w)
+        _open(db, owner)
+        db.execute(update(wallets).where(wallets.c.owner == owner).values(balance=wallets.c.balance + amt))
+        db.execute(insert(WalletTx.__table__).values(created_at=datetime.utcnow(), owner=owner, amount=amt, reason=reason or "credit"))
         db.commit()
         return True
 
 
 def debit(amount: float, reason: str = "", owner: str = DEFAULT_OWNER) -> bool:  # debit wallet by amount if sufficient funds; returns success
-    try:
-        amt = float(amount)
-    except Exception:
-        return False
-    if amt <= 0:
+    amt = _amount(amount)
+    if amt is None:
         return False
 
+    wallets = Wallet.__table__
     with SessionLocal() as db:
-        w = _get_wallet(db, owner)
-        if float(w.balance) < amt:
+        # the funds check and the subtraction are one statement, so concurrent debits can't overdraw
+        new_balance = db.scalar(
+            update(wallets)
+            .where(wallets.c.owner == owner, wallets.c.balance >= amt)
+            .values(balance=wallets.c.balance - amt)
+            .returning(wallets.c.balance)
+        )
+        if new_balance is None:
+            db.rollback()
             return False
-        w.balance = float(w.balance) - amt
-        db.add(WalletTx(owner=owner, amount=-amt, reason=reason or "debit"))
-        db.add(w)
+        db.execute(insert(WalletTx.__table__).values(created_at=datetime.utcnow(), owner=owner, amount=-amt, reason=reason or "debit"))
         db.commit()
         return True
 
 
-def balance(owner: str = DEFAULT_OWNER) -> float:   # get current wallet balance
+def apply_credits(db, payouts: Iterable[tuple[str, float, str]]) -> int:  # credit many (owner, amount, reason) rows inside the caller's transaction; returns rows applied
+    now = datetime.utcnow()
+    txs: list[dict] = []
+    totals: dict[str, float] = {}
+    for owner, amount, reason in payouts:
+        amt = _amount(amount)
+        if amt is None:
+            continue
+        txs.append({"created_at": now, "owner": owner, "amount": amt, "reason": reason or "credit"})
+        totals[owner] = totals.get(owner, 0.0) + amt
+    if not txs:
+        return 0
+
+    wallets = Wallet.__table__
+    db.execute(
+        sqlite_insert(wallets).on_conflict_do_nothing(index_elements=["owner"]),
+        [{"owner": o, "balance": 0.0} for o in totals],
+    )
+    # one relative update per owner, however many payouts they received
+    db.execute(
+        update(wallets)
+        .where(wallets.c.owner == bindparam("o"))
+        .values(balance=wallets.c.balance + bindparam("delta")),
+        [{"o": o, "delta": d} for o, d in totals.items()],
+    )
+    db.execute(insert(WalletTx.__table__), txs)
+    return len(txs)
+
+
+def credit_many(payouts: Iterable[tuple[str, float, str]]) -> int:   # credit many (owner, amount, reason) rows in one transaction; returns rows applied
     with SessionLocal() as db:
+        applied = apply_credits(db, payouts)
+        db.commit()
+        return applied
+
+
+def balance(owner: str = DEFAULT_OWNER) -> float:   # get current wallet balance
+    with ReadSessionLocal() as db:
         w = db.scalar(select(Wallet).where(Wallet.owner == owner))
         return float(w.balance if w else 0.0)
 
 
 def history(limit: int = 50, owner: str = DEFAULT_OWNER):  # get recent wallet transactions, most recent first
-    with SessionLocal() as db:
+    with ReadSessionLocal() as db:
         stmt = (
             select(WalletTx)
             .where(WalletTx.owner == owner)
@@ -91,3 +149,113 @@ def history(limit: int = 50, owner: str = DEFAULT_OWNER):  # get recent wallet t
             .limit(limit)
         )
         return list(db.scalars(stmt))
+
+
+def _latest_checkpoints(owner: str | None = None):   # subquery: each owner's newest checkpoint
+    cps = WalletCheckpoint.__table__
+    newest = select(cps.c.owner, func.max(cps.c.last_tx_id).label("last_tx_id")).group_by(cps.c.owner)
+    if owner is not None:
+        newest = newest.where(cps.c.owner == owner)
+    newest = newest.subquery()
+    return (
+        select(cps.c.owner, cps.c.last_tx_id, cps.c.as_of, cps.c.balance)
+        .join(newest, and_(cps.c.owner == newest.c.owner, cps.c.last_tx_id == newest.c.last_tx_id))
+        .subquery("latest")
+    )
+
+
+def _after(latest):    # ledger rows not yet folded into the owner's latest checkpoint
+    txs = WalletTx.__table__
+    # bounded by id alone (seeks the (owner, id) index): created_at comes from the writer's clock and may run backwards
+    return or_(
+        latest.c.owner.is_(None),   # owner has never been checkpointed
+        and_(txs.c.owner == latest.c.owner, txs.c.id > latest.c.last_tx_id),
+    )
+
+
+def checkpoint(owner: str | None = None, min_tail: int = 1) -> int:  # fold ledger tails of at least min_tail rows into new checkpoints; returns checkpoints written
+    txs = WalletTx.__table__
+    latest = _latest_checkpoints(owner)
+    tail = (
+        select(
+            txs.c.owner,
+            func.max(txs.c.id),
+            # sqlite's two-argument max(): as_of never moves back, even if the tail holds older timestamps
+            func.max(func.max(txs.c.created_at), func.coalesce(func.max(latest.c.as_of), func.max(txs.c.created_at))),
+            func.coalesce(func.max(latest.c.balance), 0.0) + func.sum(txs.c.amount),
+            func.count(),
+            literal(datetime.utcnow()),
+        )
+        .select_from(txs.outerjoin(latest, latest.c.owner == txs.c.owner))
+        .where(_after(latest))
+        .group_by(txs.c.owner)
+        .having(func.count() >= min_tail)
+    )
+    if owner is not None:
+        tail = tail.where(txs.c.owner == owner)
+    # one statement reads the tail and writes the checkpoint, so it can't miss a concurrent transaction
+    stmt = (
+        sqlite_insert(WalletCheckpoint.__table__)
+        .from_select(["owner", "last_tx_id", "as_of", "balance", "tx_count", "created_at"], tail)
+        .on_conflict_do_nothing(index_elements=["owner", "last_tx_id"])
+    )
+    with SessionLocal() as db:
+        written = db.execute(stmt).rowcount
+        db.commit()
+        return written
+
+
+def balance_at(ts: datetime, owner: str = DEFAULT_OWNER) -> float:    # ledger balance as of ts (utc): nearest earlier checkpoint plus the transactions up to the next one
+    cps = WalletCheckpoint.__table__
+    txs = WalletTx.__table__
+    with ReadSessionLocal() as db:
+        cp = db.execute(
+            select(cps.c.last_tx_id, cps.c.balance)
+            .where(cps.c.owner == owner, cps.c.as_of <= ts)
+            .order_by(cps.c.as_of.desc(), cps.c.last_tx_id.desc())
+            .limit(1)
+        ).first()
+        nxt = db.scalar(
+            select(cps.c.last_tx_id)
+            .where(cps.c.owner == owner, cps.c.as_of > ts)
+            .order_by(cps.c.as_of.asc(), cps.c.last_tx_id.asc())
+            .limit(1)
+        )
+        stmt = select(func.coalesce(func.sum(txs.c.amount), 0.0)).where(txs.c.owner == owner, txs.c.created_at <= ts)
+        start = 0.0
+        if cp is not None:
+            stmt = stmt.where(txs.c.id > cp.last_tx_id)     # as_of is the newest created_at folded in, so nothing after ts is in cp
+            start = float(cp.balance)
+        if nxt is not None:
+            # the tail is read by id between the two checkpoints, so it costs at most one checkpoint interval.
+            # a row stamped at or before ts but written after the next checkpoint (a late clock) counts as
+            # after ts: history already covered by a checkpoint is never rewritten
+            stmt = stmt.where(txs.c.id <= nxt)
+        return round(start + float(db.scalar(stmt)), 2)
+
+
+def reconcile(owner: str | None = None) -> list[dict]:  # wallets whose balance disagrees with their ledger; advances checkpoints so the next check only reads new rows
+    wallets = Wallet.__table__
+    txs = WalletTx.__table__
+    latest = _latest_checkpoints(owner)
+    tail = (
+        select(func.coalesce(func.sum(txs.c.amount), 0.0))
+        .where(txs.c.owner == wallets.c.owner, _after(latest))
+        .scalar_subquery()
+    )
+    ledger = func.coalesce(latest.c.balance, 0.0) + tail
+    stmt = (
+        select(wallets.c.owner, wallets.c.balance, ledger.label("ledger"))
+        .select_from(wallets.outerjoin(latest, latest.c.owner == wallets.c.owner))
+        .where(func.abs(wallets.c.balance - ledger) >= DRIFT_TOLERANCE)
+    )
+    if owner is not None:
+        stmt = stmt.where(wallets.c.owner == owner)
+    with ReadSessionLocal() as db:
+        drifted = [
+            {"owner": o, "balance": float(b), "ledger": round(float(l), 2), "drift": round(float(b) - float(l), 2)}
+            for o, b, l in db.execute(stmt)
+        ]
+    # only a full interval is folded in, so frequent reconciles don't write a checkpoint per transaction
+    checkpoint(owner, min_tail=CHECKPOINT_EVERY)
+    return drifted
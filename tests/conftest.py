@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# the db and response-cache paths are read at import, so point them at scratch files first
+_DB_DIR = tempfile.mkdtemp(prefix="cfb-tests-")
+os.environ["CFB_DB_PATH"] = os.path.join(_DB_DIR, "storage.db")
+os.environ["CFB_CACHE_PATH"] = os.path.join(_DB_DIR, "espn_cache.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.base import Base, SessionLocal, sync_schema  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def db():
+    # every test starts from empty tables
+    sync_schema()
+    yield
+    with SessionLocal() as s:
+        for table in reversed(Base.metadata.sorted_tables):
+            s.execute(table.delete())
+        s.commit()
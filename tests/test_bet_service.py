@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from models.base import SessionLocal
+from models.bet import BetSlip, SlipStatus
+from services.bet_service import create_slips, list_slips_page
+
+T0 = datetime(2026, 9, 1, 12, 0)
+
+
+def _seed(n, owner="default", minutes=lambda i: i):
+    # n one-leg slips; minutes(i) sets each created_at offset, so ties are easy to make
+    ids, rejects = create_slips([
+        {"legs": [(f"e{i}", "A")], "stake": 1.0, "owner": owner, "created_at": T0 + timedelta(minutes=minutes(i))}
+        for i in range(n)
+    ])
+    assert rejects == []
+    return ids
+
+
+def _walk(page_size, **kwargs):
+    # every page in order; returns (ids seen, pages fetched)
+    seen, pages, cursor = [], 0, None
+    while True:
+        page, cursor = list_slips_page(cursor=cursor, page_size=page_size, **kwargs)
+        pages += 1
+        seen.extend(s.id for s in page)
+        assert pages <= 100, "cursor is not advancing"
+        if cursor is None:
+            return seen, pages
+
+
+# list_slips_page
+
+@pytest.mark.parametrize("newest_first", [True, False])
+def test_pages_cover_every_slip_once_in_order(newest_first):
+    ids = _seed(23)
+    seen, pages = _walk(5, newest_first=newest_first)
+    assert seen == (ids[::-1] if newest_first else ids)
+    assert pages == 5
+
+
+@pytest.mark.parametrize("newest_first", [True, False])
+def test_ties_on_created_at_are_broken_by_id(newest_first):
+    ids = _seed(12, minutes=lambda i: i // 4)   # four slips share each timestamp
+    seen, _pages = _walk(3, newest_first=newest_first)
+    expected = sorted(ids, key=lambda sid: (ids.index(sid) // 4, sid), reverse=newest_first)
+    assert seen == expected
+
+
+def test_last_full_page_has_no_cursor():
+    _seed(10)
+    _seen, pages = _walk(5)
+    assert pages == 2   # no trailing empty page
+
+
+def test_empty_listing():
+    assert list_slips_page() == ([], None)
+
+
+def test_status_and_owner_filters():
+    mine = _seed(6)
+    _seed(4, owner="bob")
+    with SessionLocal() as db:
+        db.execute(update(BetSlip).where(BetSlip.id.in_(mine[:2])).values(status=SlipStatus.SETTLED))
+        db.commit()
+
+    assert _walk(2, status="SETTLED", owner="default", newest_first=False)[0] == mine[:2]
+    assert _walk(2, status=SlipStatus.PENDING, owner="default", newest_first=False)[0] == mine[2:]
+    assert len(_walk(3, owner="bob")[0]) == 4
+    assert len(_walk(3)[0]) == 10   # owner=None lists every account
+
+
+def test_new_slips_do_not_shift_later_pages():
+    ids = _seed(6)
+    page, cursor = list_slips_page(cursor=None, page_size=3)
+    assert [s.id for s in page] == ids[5:2:-1]
+
+    # a slip placed while the user reads page one must not repeat a row on page two
+    _seed(1, minutes=lambda _i: 60)
+    page, cursor = list_slips_page(cursor=cursor, page_size=3)
+    assert [s.id for s in page] == ids[2::-1]
+    assert cursor is None
+
+
+# create_slips / import_slips
+
+def _legs_by_slip():
+    with SessionLocal() as db:
+        return {s.id: [(l.event_id, l.pick_team_name) for l in s.legs] for s in db.query(BetSlip)}
+
+
+def test_create_slips_matches_legs_to_their_slip():
+    ids, rejects = create_slips([
+        {"legs": [("1", "A")], "stake": 2},
+        {"legs": [(" 2 ", " B "), ("3", "C"), ("4", "D")], "stake": "7.5", "owner": "bob", "created_at": T0},
+    ])
+    assert rejects == []
+    assert _legs_by_slip() == {ids[0]: [("1", "A")], ids[1]: [("2", "B"), ("3", "C"), ("4", "D")]}
+    with SessionLocal() as db:
+        first, second = db.get(BetSlip, ids[0]), db.get(BetSlip, ids[1])
+        assert (first.owner, first.legs_count, first.pending_legs) == ("default", 1, 1)
+        assert (second.owner, second.stake_tokens, second.created_at, second.pending_legs) == ("bob", 7.5, T0, 3)
+
+
+@pytest.mark.parametrize("row, reason", [
+    ({"legs": [("1", "A"), ("2", "B")], "stake": 5}, "Leg count"),
+    ({"legs": [], "stake": 5}, "Leg count"),
+    ({"legs": [(None, "A")], "stake": 5}, "event id and a pick"),
+    ({"legs": [("1", "  ")], "stake": 5}, "event id and a pick"),
+    ({"legs": ["ab"], "stake": 5}, "(event id, pick) pair"),
+    ({"legs": "ab", "stake": 5}, "(event id, pick) pair"),
+    ({"legs": [("1", "A", "x")], "stake": 5}, "(event id, pick) pair"),
+    ({"legs": 5, "stake": 5}, "(event id, pick) pair"),
+    ({"legs": [("1", "A")], "stake": 0}, "> 0"),
+    ({"legs": [("1", "A")], "stake": "abc"}, "number"),
+    ({"legs": [("1", "A")], "stake": float("nan")}, "finite"),
+    ({"legs": [("1", "A")], "stake": float("inf")}, "finite"),
+])
+def test_create_slips_rejects_bad_rows_alone(row, reason):
+    good = {"legs": [("9", "Z")], "stake": 1}
+    ids, rejects = create_slips([good, row, good])
+    assert len(ids) == 2
+    assert [i for i, _why in rejects] == [1]
+    assert reason in rejects[0][1]
+    assert all(legs == [("9", "Z")] for legs in _legs_by_slip().values())
+
+
+def test_create_slips_with_every_row_rejected_writes_nothing():
+    assert create_slips([{"legs": ["ab"], "stake": 1}]) == ([], [(0, "Every leg must be an (event id, pick) pair.")])
+    assert _legs_by_slip() == {}
+
+
+def test_import_reports_rejects_by_line(tmp_path):
+    from helpers.import_slips import import_slips
+    path = tmp_path / "slips.jsonl"
+    path.write_text("\n".join([
+        '{"legs": [["1", "A"]], "stake": 5}',
+        '{"legs": ["12"], "stake": 5}',
+        'not json',
+        '{"legs": [{"event_id": "2", "pick": "B"}], "stake": 5, "owner": "bob"}',
+        '{"legs": [{"event_id": null, "pick": "B"}], "stake": 5}',
+        '{"legs": "3:C;4:D;5:E", "stake": 1, "created_at": "2026-09-01T12:00:00Z"}',
+    ]) + "\n")
+
+    report = import_slips(str(path), owner="alice", batch_size=2)
+    assert (report["created"], report["rejected"]) == (3, 3)
+    assert [r["line"] for r in report["rejects"]] == [2, 3, 5]
+    with SessionLocal() as db:
+        assert sorted(s.owner for s in db.query(BetSlip)) == ["alice", "alice", "bob"]
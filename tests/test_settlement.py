@@ -0,0 +1,189 @@
+import pytest
+
+import espn
+from models.base import SessionLocal
+from models.bet import BetSlip, LegResult, SlipStatus
+from services import settlement_service
+from services.bet_service import create_slip
+from services.settlement_service import _decide, _tally, settle
+
+W, L, P, M = LegResult.WIN, LegResult.LOSS, LegResult.PENDING, LegResult.MOOT
+
+
+def _slip(*legs):
+    # snapshot shaped like _load_slips: legs are (event_id, pick, stored result)
+    return {
+        "owner": "default",
+        "legs_count": len(legs),
+        "stake": 10.0,
+        "legs": [{"id": i, "event_id": eid, "pick": pick, "result": res} for i, (eid, pick, res) in enumerate(legs, start=1)],
+    }
+
+
+def _summary(winner, state):
+    # the parts of an ESPN summary that _winner_from_summary reads
+    competitors = [{"winner": True, "team": {"displayName": winner}}] if winner else []
+    return {"header": {"competitions": [{"status": {"type": {"state": state}}, "competitors": competitors}]}}
+
+
+@pytest.fixture
+def games(monkeypatch):
+    # event_id -> winner of a final game; events not listed are still in progress
+    finals: dict[str, str | None] = {}
+
+    def fake_get_summary(self, event_id, deadline_at=None):
+        if event_id in finals:
+            return _summary(finals[event_id], "post")
+        return _summary(None, "in")
+
+    monkeypatch.setattr(espn.ESPNClient, "get_summary", fake_get_summary)
+    return finals
+
+
+def _place(*legs):
+    slip, msg = create_slip(list(legs), 10.0)
+    assert slip is not None, msg
+    return slip.id
+
+
+def _stored(slip_id):
+    with SessionLocal() as db:
+        slip = db.get(BetSlip, slip_id)
+        return slip.status, (slip.wins, slip.losses, slip.pending_legs), {l.event_id: l.result for l in slip.legs}
+
+
+# _tally / _decide
+
+def test_threshold_reached_before_every_leg_is_final():
+    slip = _slip(("e1", "A", P), ("e2", "B", P), ("e3", "C", P))
+    results = {"e1": ("A", True), "e2": ("B", True), "e3": (None, False)}
+
+    updates, open_legs, won = _tally(slip, results)
+    assert won is True
+    assert [l["event_id"] for l in open_legs] == ["e3"]
+    assert updates == [{"leg_id": 1, "new_result": W}, {"leg_id": 2, "new_result": W}]
+
+    updates, decided = _decide({7: slip}, results)
+    assert decided == [(7, True)]
+    assert {"leg_id": 3, "new_result": M} in updates
+
+
+def test_loss_makes_threshold_unreachable():
+    slip = _slip(("e1", "A", P), ("e2", "B", P), ("e3", "C", P))
+    results = {"e1": ("X", True), "e2": ("Y", True)}
+
+    _updates, open_legs, won = _tally(slip, results)
+    assert won is False
+    assert len(open_legs) == 1
+
+    updates, decided = _decide({7: slip}, results)
+    assert decided == [(7, False)]
+    assert [u["new_result"] for u in updates] == [L, L, M]
+
+
+def test_final_without_a_winner_is_a_loss():
+    updates, _open_legs, won = _tally(_slip(("e1", "A", P)), {"e1": (None, True)})
+    assert updates == [{"leg_id": 1, "new_result": L}]
+    assert won is False
+
+
+def test_undecided_slip_gets_no_moot_legs():
+    slip = _slip(("e1", "A", P), ("e2", "B", P), ("e3", "C", P))
+    results = {"e1": ("A", True), "e2": ("Y", True)}
+
+    _updates, open_legs, won = _tally(slip, results)
+    assert won is None
+    assert len(open_legs) == 1
+
+    updates, decided = _decide({7: slip}, results)
+    assert decided == []
+    assert all(u["new_result"] != M for u in updates)
+
+
+def test_already_decided_legs_count_but_are_not_rewritten():
+    # two wins stored by an earlier pass, one more final win now
+    slip = _slip(("e1", "A", W), ("e2", "B", W), ("e3", "C", L), ("e4", "D", P), ("e5", "E", P))
+    results = {"e1": ("Z", True), "e4": ("D", True)}
+
+    updates, open_legs, won = _tally(slip, results)
+    assert won is True
+    assert updates == [{"leg_id": 4, "new_result": W}]
+    assert [l["event_id"] for l in open_legs] == ["e5"]
+
+
+def test_moot_legs_are_not_open_or_wins():
+    slip = _slip(("e1", "A", W), ("e2", "B", M), ("e3", "C", P))
+    _updates, open_legs, won = _tally(slip, {})
+    assert won is None
+    assert [l["event_id"] for l in open_legs] == ["e3"]
+
+
+# settle() against a fake ESPN summary
+
+def test_settle_decides_early_and_moots_open_legs(games):
+    slip_id = _place(("e1", "A"), ("e2", "B"), ("e3", "C"))
+    games.update({"e1": "A", "e2": "B"})
+
+    report = settle(use_scoreboard=False)
+    assert (report["checked"], report["settled"]) == (1, 1)
+
+    status, counters, legs = _stored(slip_id)
+    assert status == SlipStatus.SETTLED
+    assert legs == {"e1": W, "e2": W, "e3": M}
+    assert counters == (2, 0, 0)   # a moot leg is neither a result nor pending
+
+
+def test_settle_on_unreachable_threshold(games):
+    slip_id = _place(("e1", "A"), ("e2", "B"), ("e3", "C"))
+    games.update({"e1": "X", "e2": "Y"})
+
+    assert settle(use_scoreboard=False)["settled"] == 1
+    status, counters, legs = _stored(slip_id)
+    assert status == SlipStatus.SETTLED
+    assert legs == {"e1": L, "e2": L, "e3": M}
+    assert counters == (0, 2, 0)
+
+
+def test_partial_results_update_counters_and_later_pass_settles(games):
+    slip_id = _place(("e1", "A"), ("e2", "B"), ("e3", "C"))
+    games["e1"] = "A"
+
+    assert settle(use_scoreboard=False)["settled"] == 0
+    status, counters, legs = _stored(slip_id)
+    assert status == SlipStatus.PENDING
+    assert legs == {"e1": W, "e2": P, "e3": P}
+    assert counters == (1, 0, 2)
+
+    # the stored win counts toward the threshold on the next pass
+    games["e2"] = "B"
+    assert settle(use_scoreboard=False)["settled"] == 1
+    _status, counters, legs = _stored(slip_id)
+    assert legs == {"e1": W, "e2": W, "e3": M}
+    assert counters == (2, 0, 0)
+
+
+def test_moot_leg_stays_moot_once_its_game_ends(games):
+    slip_id = _place(("e1", "A"), ("e2", "B"), ("e3", "C"))
+    games.update({"e1": "A", "e2": "B"})
+    settle(use_scoreboard=False)
+
+    games["e3"] = "X"
+    report = settle(use_scoreboard=False)
+    assert (report["checked"], report["settled"]) == (0, 0)
+    _status, counters, legs = _stored(slip_id)
+    assert legs["e3"] == M
+    assert counters == (2, 0, 0)
+
+
+def test_winning_slip_is_credited_once(games, monkeypatch):
+    from services import wallet_service
+    monkeypatch.setattr(settlement_service, "CREDIT_ON_WIN", True)
+    wallet_service.ensure_wallet(0.0)
+    before = wallet_service.balance()
+
+    _place(("e1", "A"), ("e2", "B"), ("e3", "C"))
+    games.update({"e1": "A", "e2": "B", "e3": "C"})
+    settle(use_scoreboard=False)
+    settle(use_scoreboard=False)
+
+    assert wallet_service.balance() == pytest.approx(before + 50.0)   # 3 legs pay 5x the stake
@@ -0,0 +1,249 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from models.base import SessionLocal
+from models.wallet import Wallet, WalletCheckpoint, WalletTx
+from services import wallet_service
+from services.wallet_service import (
+    apply_credits, balance, balance_at, checkpoint, credit, credit_many, debit, ensure_wallet, reset_wallet,
+)
+
+
+def _ledger(owner="default"):
+    # (sum, rows) of the owner's transaction log
+    with SessionLocal() as db:
+        total, rows = db.execute(
+            select(func.coalesce(func.sum(WalletTx.amount), 0.0), func.count()).where(WalletTx.owner == owner)
+        ).one()
+        return round(total, 2), rows
+
+
+# debit / credit
+
+def test_debit_subtracts_and_logs():
+    ensure_wallet(100.0)
+    assert debit(30.0, "stake") is True
+    assert balance() == pytest.approx(70.0)
+    assert _ledger() == (70.0, 2)
+
+
+def test_debit_refuses_to_overdraw():
+    ensure_wallet(20.0)
+    assert debit(20.01) is False
+    assert balance() == pytest.approx(20.0)
+    assert _ledger() == (20.0, 1)
+
+
+@pytest.mark.parametrize("amount", [0, -5, "abc", None])
+def test_debit_and_credit_reject_non_positive_amounts(amount):
+    ensure_wallet(10.0)
+    assert debit(amount) is False
+    assert credit(amount) is False
+    assert _ledger() == (10.0, 1)
+
+
+def test_debit_without_a_wallet_fails():
+    assert debit(1.0, owner="nobody") is False
+    assert _ledger("nobody") == (0.0, 0)
+
+
+def test_concurrent_debits_never_overdraw():
+    ensure_wallet(100.0)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _i: debit(10.0, "race"), range(20)))
+    assert results.count(True) == 10
+    assert balance() == pytest.approx(0.0)
+    assert _ledger() == (0.0, 11)
+
+
+def test_credit_opens_a_missing_wallet():
+    assert credit(12.5, "gift", owner="alice") is True
+    assert balance("alice") == pytest.approx(12.5)
+    assert _ledger("alice") == (12.5, 1)
+
+
+# apply_credits / credit_many
+
+def test_credit_many_sums_per_owner_and_logs_each_payout():
+    ensure_wallet(10.0)
+    applied = credit_many([
+        ("default", 5.0, "slip #1"),
+        ("default", 2.5, "slip #2"),
+        ("bob", 4.0, "slip #3"),
+        ("bob", 0, "skipped"),
+        ("bob", "bad", "skipped"),
+    ])
+    assert applied == 3
+    assert balance() == pytest.approx(17.5)
+    assert balance("bob") == pytest.approx(4.0)
+    assert _ledger() == (17.5, 3)
+    assert _ledger("bob") == (4.0, 1)
+
+
+def test_credit_many_with_nothing_to_apply():
+    assert credit_many([]) == 0
+    assert credit_many([("default", -1.0, "refund")]) == 0
+    assert _ledger() == (0.0, 0)
+
+
+def test_apply_credits_rolls_back_with_the_callers_transaction():
+    ensure_wallet(10.0)
+    with SessionLocal() as db:
+        assert apply_credits(db, [("default", 5.0, "payout")]) == 1
+        db.rollback()
+    assert balance() == pytest.approx(10.0)
+    assert _ledger() == (10.0, 1)
+
+
+# reset_wallet
+
+def test_reset_logs_the_delta_from_the_replaced_balance():
+    ensure_wallet(100.0)
+    debit(35.5)
+    reset_wallet(1000.0)
+    assert balance() == pytest.approx(1000.0)
+    assert _ledger() == (1000.0, 3)   # the reset row carries +935.50
+
+
+def test_reset_to_the_current_balance_writes_no_row():
+    ensure_wallet(50.0)
+    reset_wallet(50.0)
+    assert _ledger() == (50.0, 1)
+
+
+def test_reset_opens_a_missing_wallet():
+    reset_wallet(25.0, owner="carol")
+    assert balance("carol") == pytest.approx(25.0)
+    assert _ledger("carol") == (25.0, 1)
+
+
+def test_ledger_matches_balance_after_mixed_operations():
+    ensure_wallet(100.0)
+    debit(40.0)
+    credit_many([("default", 15.0, "win")])
+    reset_wallet(60.0)
+    debit(100.0)    # refused
+    credit(0.25)
+    assert _ledger()[0] == pytest.approx(balance())
+    assert wallet_service.reconcile() == []
+
+
+# checkpoints / balance_at / reconcile
+
+T0 = datetime(2026, 9, 1, 12, 0)
+
+
+def _tx(amount, hours, owner="default", move_balance=True):
+    # ledger row stamped T0 + hours; move_balance=False leaves the wallet behind, i.e. drift
+    with SessionLocal() as db:
+        db.add(WalletTx(owner=owner, amount=amount, created_at=T0 + timedelta(hours=hours), reason="test"))
+        if move_balance:
+            db.execute(update(Wallet).where(Wallet.owner == owner).values(balance=Wallet.balance + amount))
+        db.commit()
+
+
+def _checkpoints(owner="default"):
+    with SessionLocal() as db:
+        return db.execute(
+            select(WalletCheckpoint.last_tx_id, WalletCheckpoint.as_of, WalletCheckpoint.balance, WalletCheckpoint.tx_count)
+            .where(WalletCheckpoint.owner == owner)
+            .order_by(WalletCheckpoint.last_tx_id)
+        ).all()
+
+
+def _naive_balance_at(ts, owner="default"):
+    with SessionLocal() as db:
+        return round(db.scalar(
+            select(func.coalesce(func.sum(WalletTx.amount), 0.0)).where(WalletTx.owner == owner, WalletTx.created_at <= ts)
+        ), 2)
+
+
+@pytest.fixture
+def wallet():
+    with SessionLocal() as db:
+        db.add(Wallet(owner="default", balance=0.0))
+        db.commit()
+
+
+def test_checkpoint_folds_only_tails_of_min_tail_rows(wallet):
+    for h in range(3):
+        _tx(10.0, h)
+    assert checkpoint(min_tail=4) == 0
+    assert checkpoint() == 1
+    assert checkpoint() == 0    # nothing new since
+
+    _tx(5.0, 3)
+    _tx(-2.5, 4)
+    assert checkpoint(min_tail=3) == 0
+    assert checkpoint(min_tail=2) == 1
+    (_id1, as_of1, bal1, n1), (_id2, as_of2, bal2, n2) = _checkpoints()
+    assert (as_of1, bal1, n1) == (T0 + timedelta(hours=2), 30.0, 3)
+    assert (as_of2, bal2, n2) == (T0 + timedelta(hours=4), 32.5, 2)
+
+
+def test_checkpoint_is_per_owner(wallet):
+    ensure_wallet(0.0, owner="bob")
+    _tx(1.0, 0)
+    _tx(7.0, 0, owner="bob")
+    assert checkpoint(owner="bob") == 1
+    assert _checkpoints() == []
+    assert [c.balance for c in _checkpoints("bob")] == [7.0]
+
+
+def test_balance_at_matches_a_full_ledger_scan(wallet):
+    amounts = [100.0, -20.0, 5.0, 7.5, -1.0, 40.0, -60.0, 3.25, 2.0, -9.0]
+    for h, amt in enumerate(amounts):
+        _tx(amt, h)
+        if h in (2, 5, 8):
+            checkpoint()
+    assert len(_checkpoints()) == 3
+
+    for minutes in range(-30, 11 * 60, 30):
+        ts = T0 + timedelta(minutes=minutes)
+        assert balance_at(ts) == _naive_balance_at(ts), ts
+
+
+def test_balance_at_with_a_late_stamped_row(wallet):
+    for h in range(4):
+        _tx(10.0, h)
+    checkpoint()                # as_of = T0+3h
+    _tx(1.0, 1)                 # written after the checkpoint, stamped T0+1h by a slow clock
+
+    # once its tail is read, the late row counts at its own timestamp
+    assert balance_at(T0 + timedelta(hours=3)) == 41.0
+    assert balance_at(T0 + timedelta(hours=5)) == 41.0
+
+    # folded in, the next checkpoint keeps as_of from moving back
+    checkpoint()
+    assert [c.as_of for c in _checkpoints()] == [T0 + timedelta(hours=3)] * 2
+    assert balance_at(T0 + timedelta(hours=3)) == 41.0
+    # a time the first checkpoint already covered reads as that checkpoint saw it: the late row is not back-dated
+    assert balance_at(T0 + timedelta(hours=1)) == 20.0
+    assert wallet_service.reconcile() == []
+
+
+def test_reconcile_reports_drift(wallet):
+    _tx(50.0, 0)
+    _tx(-10.0, 1, move_balance=False)
+    assert wallet_service.reconcile() == [{"owner": "default", "balance": 50.0, "ledger": 40.0, "drift": 10.0}]
+
+    # drift is also found through a checkpoint
+    checkpoint()
+    _tx(5.0, 2)
+    assert wallet_service.reconcile()[0]["drift"] == 10.0
+
+
+def test_reconcile_only_checkpoints_full_intervals(wallet, monkeypatch):
+    monkeypatch.setattr(wallet_service, "CHECKPOINT_EVERY", 3)
+    _tx(1.0, 0)
+    _tx(1.0, 1)
+    assert wallet_service.reconcile() == []
+    assert wallet_service.reconcile() == []
+    assert _checkpoints() == []
+
+    _tx(1.0, 2)
+    assert wallet_service.reconcile() == []
+    assert [c.tx_count for c in _checkpoints()] == [3]